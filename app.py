@@ -1,9 +1,13 @@
 # app.py
 import streamlit as st
 from streamlit_extras.switch_page_button import switch_page
+import warmup
 
 st.set_page_config(page_title="Eastwood Dashboard", layout="wide")
 
+# Veelgebruikte queries op de achtergrond opwarmen zodra het proces start
+warmup.start()
+
 st.markdown("""
 # 📊 Market & Macro Dashboard
 
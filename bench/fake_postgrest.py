@@ -0,0 +1,240 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from bench.generate import option_snapshot
+
+# Lokale stand-in voor de Supabase REST API (PostgREST) met genoeg syntax voor de loaders:
+# select, eq/neq/gt/gte/lt/lte/in/is-filters, or=(...) met geneste and(...), order, limit/offset
+# en de Range-header. Tabellen zijn kolomsgewijze numpy-arrays; filters worden gevectoriseerd.
+# Extra endpoints: GET /_stats, POST /_reset en POST /_append?table=spx_options2&snapshots=1.
+
+# Natuurlijke sortering van de gegenereerde tabellen; order-requests op een prefix hiervan
+# hoeven niet opnieuw gesorteerd te worden
+NATURAL_ORDER = {
+    "fx_rates": ("date",),
+    "sp500_delta_view": ("date",),
+    "spx_options2": ("snapshot_date", "id"),
+}
+
+
+class Table:
+    def __init__(self, columns: dict, kinds: dict, natural=()):
+        self.columns = columns
+        self.kinds = kinds
+        self.natural = tuple(natural)
+        self.lock = threading.Lock()
+        self._text = {}
+
+    def __len__(self):
+        return len(next(iter(self.columns.values())))
+
+    def append(self, columns: dict) -> None:
+        with self.lock:
+            self.columns = {c: np.concatenate([self.columns[c], columns[c]]) for c in self.columns}
+            self._text = {}
+
+    def coerce(self, column: str, value: str):
+        kind = self.kinds[column]
+        if len(value) >= 2 and value[0] == value[-1] == '"':
+            value = value[1:-1]
+        if kind == "number":
+            return float(value)
+        if kind in ("date", "timestamp"):
+            ts = pd.Timestamp(value)
+            return (ts.tz_convert("UTC").tz_localize(None) if ts.tzinfo else ts).value
+        return value
+
+    def text(self, column: str) -> list:
+        # JSON-weergave zoals PostgREST die geeft (datums als ISO-strings)
+        if column not in self._text:
+            values = self.columns[column]
+            kind = self.kinds[column]
+            if kind == "date":
+                self._text[column] = pd.to_datetime(values).strftime("%Y-%m-%d").tolist()
+            elif kind == "timestamp":
+                self._text[column] = pd.to_datetime(values).strftime("%Y-%m-%dT%H:%M:%S+00:00").tolist()
+            else:
+                self._text[column] = values.tolist()
+        return self._text[column]
+
+
+def _split(expr: str) -> list:
+    # Splits op komma's op het hoogste niveau (niet binnen haakjes of quotes)
+    parts, depth, quoted, current = [], 0, False, ""
+    for ch in expr:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0 and not quoted:
+            parts.append(current)
+            current = ""
+        else:
+            current += ch
+    parts.append(current)
+    return parts
+
+
+def _condition(table: Table, column: str, expr: str, cols: dict) -> np.ndarray:
+    negate = expr.startswith("not.")
+    if negate:
+        expr = expr[4:]
+    op, _, value = expr.partition(".")
+    data = cols[column]
+    if op == "in":
+        values = [table.coerce(column, v) for v in _split(value.strip("()"))]
+        mask = np.isin(data, values)
+    elif op == "is":
+        mask = pd.isna(data) if value == "null" else np.zeros(len(data), dtype=bool)
+    else:
+        v = table.coerce(column, value)
+        mask = {
+            "eq": lambda: data == v, "neq": lambda: data != v, "gt": lambda: data > v,
+            "gte": lambda: data >= v, "lt": lambda: data < v, "lte": lambda: data <= v,
+        }[op]()
+    return ~mask if negate else mask
+
+
+def _logical(table: Table, op: str, expr: str, cols: dict) -> np.ndarray:
+    masks = []
+    for part in _split(expr.strip()[1:-1]):
+        if part.startswith(("and(", "or(")):
+            inner_op, _, rest = part.partition("(")
+            masks.append(_logical(table, inner_op, "(" + rest, cols))
+        else:
+            column, _, cond = part.partition(".")
+            masks.append(_condition(table, column, cond, cols))
+    combine = np.logical_and if op == "and" else np.logical_or
+    return combine.reduce(masks)
+
+
+def query(table: Table, params: list, range_header: str | None = None) -> list:
+    with table.lock:
+        cols = table.columns
+        n = len(table)
+    mask = np.ones(n, dtype=bool)
+    select, order, limit, offset = "*", None, None, 0
+    for key, value in params:
+        if key == "select":
+            select = value
+        elif key == "order":
+            order = value
+        elif key == "limit":
+            limit = int(value)
+        elif key == "offset":
+            offset = int(value)
+        elif key in ("or", "and"):
+            mask &= _logical(table, key, value, cols)
+        else:
+            mask &= _condition(table, key, value, cols)
+    if range_header and "-" in range_header:
+        lo, hi = range_header.split("-")
+        offset, limit = int(lo), int(hi) - int(lo) + 1
+
+    idx = np.flatnonzero(mask)
+    keys = [part.split(".") for part in order.split(",")] if order else []
+    presorted = all(len(k) == 1 or k[1] == "asc" for k in keys) and tuple(k[0] for k in keys) == table.natural[:len(keys)]
+    if keys and not presorted:
+        frame = pd.DataFrame({f"k{i}": cols[c][idx] for i, (c, *_) in enumerate(keys)})
+        ascending = [not (len(k) > 1 and k[1] == "desc") for k in keys]
+        idx = idx[frame.sort_values(list(frame.columns), ascending=ascending, kind="stable").index.to_numpy()]
+    idx = idx[offset:offset + limit] if limit is not None else idx[offset:]
+
+    names = list(cols) if select.strip() == "*" else [c.strip() for c in select.split(",")]
+    texts = {c: table.text(c) for c in names}
+    return [{c: texts[c][i] for c in names} for i in idx]
+
+
+class Server:
+    def __init__(self, tables: dict, latency: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.tables = {name: Table(*spec, NATURAL_ORDER.get(name, ())) for name, spec in tables.items()}
+        self.latency = latency
+        self.stats = {"requests": 0, "bytes": 0, "rows": 0}
+        self.stats_lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def append_snapshots(self, table_name: str, count: int) -> int:
+        table = self.tables[table_name]
+        cols = table.columns
+        last = pd.Timestamp(cols["snapshot_date"].max(), tz="UTC")
+        spot = float(cols["underlying_price"][-1])
+        vix = float(cols["vix"][-1])
+        per = int((cols["snapshot_date"] == cols["snapshot_date"].max()).sum())
+        strikes = max(per // 20, 1)
+        added = 0
+        for i in range(count):
+            snap = last + pd.offsets.BDay(i + 1)
+            part = option_snapshot(snap, spot, vix, int(cols["id"].max()) + 1 + added, 10, strikes)
+            table.append(part)
+            added += len(part["id"])
+        return added
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, payload, status=200, count=True):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                if count:
+                    with server.stats_lock:
+                        server.stats["requests"] += 1
+                        server.stats["bytes"] += len(body)
+                        server.stats["rows"] += len(payload) if isinstance(payload, list) else 0
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path == "/_stats":
+                    return self._send(dict(server.stats), count=False)
+                name = url.path.rsplit("/", 1)[-1]
+                if name not in server.tables:
+                    return self._send({"code": "42P01", "message": f"relation {name} does not exist"}, 404)
+                if server.latency:
+                    time.sleep(server.latency)
+                try:
+                    rows = query(server.tables[name], parse_qsl(url.query), self.headers.get("Range"))
+                except (KeyError, ValueError) as exc:
+                    return self._send({"code": "PGRST100", "message": str(exc)}, 400)
+                self._send(rows)
+
+            def do_POST(self):
+                url = urlsplit(self.path)
+                params = dict(parse_qsl(url.query))
+                if url.path == "/_reset":
+                    with server.stats_lock:
+                        server.stats = {"requests": 0, "bytes": 0, "rows": 0}
+                    return self._send({}, count=False)
+                if url.path == "/_append":
+                    added = server.append_snapshots(params.get("table", "spx_options2"), int(params.get("snapshots", 1)))
+                    return self._send({"rows": added}, count=False)
+                self._send({"code": "PGRST000", "message": "not supported"}, 405, count=False)
+
+        return Handler
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def start(self) -> "Server":
+        threading.Thread(target=self.serve_forever, name="fake-postgrest", daemon=True).start()
+        return self
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+# Synthetische marktdata met dezelfde kolommen als de Supabase-tabellen. Elke tabel is een dict
+# kolom -> numpy-array plus een dict met kolomsoorten ("date", "timestamp", "number", "text").
+START = "2015-01-02"
+
+
+def _business_days(n: int, start: str = START) -> pd.DatetimeIndex:
+    return pd.bdate_range(start, periods=n)
+
+
+def generate_fx(days: int, seed: int = 1):
+    rng = np.random.default_rng(seed)
+    dates = _business_days(days)
+    columns = {"date": dates.to_numpy(dtype="datetime64[ns]").astype(np.int64)}
+    for name, level in [("eur_usd", 0.9), ("usd_jpy", 130.0), ("gbp_usd", 0.78), ("aud_usd", 1.45), ("usd_chf", 0.92)]:
+        columns[name] = level * np.exp(np.cumsum(rng.normal(0, 0.005, days)))
+    kinds = {"date": "date", **{c: "number" for c in columns if c != "date"}}
+    return columns, kinds
+
+
+def generate_sp500(days: int, seed: int = 2):
+    rng = np.random.default_rng(seed)
+    dates = _business_days(days)
+    close = 2000 * np.exp(np.cumsum(rng.normal(0.0003, 0.011, days)))
+    delta = np.diff(close, prepend=close[0])
+    columns = {
+        "date": dates.to_numpy(dtype="datetime64[ns]").astype(np.int64),
+        "close": close,
+        "daily_delta_abs": delta,
+        "daily_delta_pct": delta / np.roll(close, 1) * 100,
+    }
+    kinds = {"date": "date", "close": "number", "daily_delta_abs": "number", "daily_delta_pct": "number"}
+    return columns, kinds
+
+
+def option_snapshot(snapshot: pd.Timestamp, spot: float, vix: float, first_id: int,
+                    expirations: int = 10, strikes: int = 50, rng=None):
+    """Eén volledige keten: expirations x strikes x (call, put)."""
+    rng = rng or np.random.default_rng(0)
+    day = snapshot.normalize().tz_localize(None)
+    exp_dates = pd.date_range(day + pd.Timedelta(days=3), periods=expirations, freq="W-FRI")
+    strike_grid = (np.round(spot / 5) * 5 + 5 * (np.arange(strikes) - strikes // 2)).astype(np.int64)
+    e, k, t = np.meshgrid(np.arange(expirations), strike_grid, [0, 1], indexing="ij")
+    e, k, t = e.ravel(), k.ravel(), t.ravel()
+    n = len(k)
+    years = ((exp_dates.to_numpy()[e] - day.to_datetime64()) / np.timedelta64(365, "D")).astype(float)
+    iv = vix / 100 * (1 + 0.3 * np.abs(k - spot) / spot * 10) + rng.normal(0, 0.005, n)
+    intrinsic = np.where(t == 1, np.clip(k - spot, 0, None), np.clip(spot - k, 0, None))
+    time_value = spot * iv * np.sqrt(years) * 0.4 * np.exp(-((k - spot) / spot) ** 2 / (2 * iv ** 2 * years))
+    mid = intrinsic + time_value
+    spread = np.maximum(0.05, mid * 0.02)
+    return {
+        "id": np.arange(first_id, first_id + n, dtype=np.int64),
+        "snapshot_date": np.full(n, snapshot.value, dtype=np.int64),
+        "type": np.where(t == 1, "put", "call").astype(object),
+        "expiration": exp_dates.to_numpy(dtype="datetime64[ns]").astype(np.int64)[e],
+        "strike": k,
+        "bid": np.round(mid - spread / 2, 2),
+        "ask": np.round(mid + spread / 2, 2),
+        "last_price": np.round(mid + rng.normal(0, spread / 4), 2),
+        "implied_volatility": np.round(iv, 4),
+        "underlying_price": np.full(n, spot),
+        "vix": np.full(n, vix),
+    }
+
+
+OPTION_KINDS = {
+    "id": "number", "snapshot_date": "timestamp", "type": "text", "expiration": "date", "strike": "number",
+    "bid": "number", "ask": "number", "last_price": "number", "implied_volatility": "number",
+    "underlying_price": "number", "vix": "number",
+}
+
+
+def generate_options(rows: int, per_snapshot: int = 1000, seed: int = 3):
+    """Ongeveer `rows` optierijen verdeeld over dagelijkse snapshots (15:00 UTC)."""
+    rng = np.random.default_rng(seed)
+    expirations = 10
+    strikes = max(per_snapshot // (2 * expirations), 1)
+    per_snapshot = expirations * strikes * 2
+    snapshots = max(int(np.ceil(rows / per_snapshot)), 1)
+    days = _business_days(snapshots)
+    spot = 4000 * np.exp(np.cumsum(rng.normal(0.0003, 0.011, snapshots)))
+    vix = np.clip(15 + np.cumsum(rng.normal(0, 0.5, snapshots)), 10, 60)
+    parts = []
+    next_id = 1
+    for i, day in enumerate(days):
+        snap = pd.Timestamp(day, tz="UTC") + pd.Timedelta(hours=15)
+        part = option_snapshot(snap, spot[i], vix[i], next_id, expirations, strikes, rng)
+        next_id += len(part["id"])
+        parts.append(part)
+    columns = {c: np.concatenate([p[c] for p in parts]) for c in OPTION_KINDS}
+    return columns, dict(OPTION_KINDS)
+
+
+def generate_all(fx_days: int = 2500, sp500_days: int = 2500, option_rows: int = 10_000):
+    return {
+        "fx_rates": generate_fx(fx_days),
+        "sp500_delta_view": generate_sp500(sp500_days),
+        "spx_options2": generate_options(option_rows),
+    }
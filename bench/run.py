@@ -0,0 +1,205 @@
+"""Benchmark van de loaders tegen een lokale fake PostgREST met synthetische data.
+
+Gebruik (vanuit de repo-root):
+
+    python -m bench.run --option-rows 10000 --latency 0.02
+    python -m bench.run --option-rows 1000000 --output bench_results.jsonl
+
+Per scenario worden de looptijd, het aantal requests, de verstuurde bytes en het piekgeheugen
+(tracemalloc) gerapporteerd. Met --output wordt elk resultaat als JSON-regel toegevoegd, zodat
+regressies over de tijd te volgen zijn.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+
+
+def _serve(sizes: dict, latency: float, queue) -> None:
+    from bench.fake_postgrest import Server
+    from bench.generate import generate_all
+
+    server = Server(generate_all(**sizes), latency=latency)
+    queue.put(server.url)
+    server.serve_forever()
+
+
+def _call(url: str, path: str, method: str = "GET") -> dict:
+    request = urllib.request.Request(url + path, method=method, data=b"" if method == "POST" else None)
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def scenarios(store_dir: str, server_url: str):
+    # Pas importeren nadat de omgeving naar de fake server en een lege store wijst
+    import cache
+    import catalog
+    import chain
+    import loaders
+    import store
+    import utils
+
+    def reset_store():
+        shutil.rmtree(store_dir, ignore_errors=True)
+        chain._chains.clear()
+        catalog._cache.clear()
+        loaders.load_fx.clear()
+        loaders.load_sp500.clear()
+
+    def chunks_offset():
+        return len(utils.get_supabase_data_in_chunks("spx_options2"))
+
+    def chunks_keyset():
+        return len(utils.get_supabase_data_in_chunks("spx_options2", keyset=("snapshot_date", "id")))
+
+    def chunks_keyset_concurrent():
+        return len(utils.get_supabase_data_in_chunks(
+            "spx_options2", keyset=("snapshot_date", "id"), workers=utils.FETCH_WORKERS
+        ))
+
+    def sync_cold():
+        reset_store()
+        return sum(store.sync_table(t, force=True) for t in store.TABLES)
+
+    def sync_incremental():
+        _call(server_url, "/_append?table=spx_options2&snapshots=1", "POST")
+        return store.sync_table("spx_options2", force=True)
+
+    def load_fx_window():
+        start, end = loaders.fx_default_window()
+        return len(loaders.load_fx(start, end))
+
+    def load_sp500():
+        return len(loaders.load_sp500())
+
+    def catalog_cold():
+        catalog._cache.clear()
+        shutil.rmtree(os.path.join(store_dir, "spx_options2", "_catalog"), ignore_errors=True)
+        combos, snapshots = catalog.refresh("spx_options2")
+        return len(combos) + len(snapshots)
+
+    def chain_build():
+        chain._chains.clear()
+        return len(chain.get_chain("spx_options2"))
+
+    def greeks_snapshot():
+        # IV-solver en greeks over de volledige laatste keten (pagina 3)
+        import greeks
+        option_chain = chain.get_chain("spx_options2")
+        return len(greeks.option_greeks(option_chain.snapshot(option_chain.data["snapshot_date"][-1])))
+
+    def chain_attach():
+        # Tweede worker: de keten staat al in de gedeelde cache en wordt alleen gekoppeld
+        chain._chains.clear()
+        return len(chain.get_chain("spx_options2"))
+
+    def chain_slices():
+        option_chain = chain.get_chain("spx_options2")
+        combos = catalog.combinations("spx_options2").head(100)
+        snapshots = catalog.snapshot_dates("spx_options2")[-5:]
+        rows = 0
+        for row in combos.itertuples():
+            rows += len(option_chain.series(row.type, row.expiration, row.strike))
+            rows += len(option_chain.strike_history(row.type, row.strike, snapshots))
+        return rows
+
+    def chain_ladders():
+        # Pagina 4, vergelijking: 20 strikeladders van 12 series, elk als één batch-slice
+        option_chain = chain.get_chain("spx_options2")
+        combos = catalog.combinations("spx_options2")
+        rows = 0
+        for (type_optie, expiration), group in list(combos.groupby(["type", "expiration"]))[:20]:
+            ladder = [(type_optie, expiration, strike) for strike in group["strike"].head(12)]
+            rows += len(option_chain.series_many(ladder))
+        return rows
+
+    # (naam, functie, equivalent van de oorspronkelijke loader)
+    return [
+        ("chunks_offset", chunks_offset, "get_supabase_data_in_chunks (offset)"),
+        ("chunks_keyset", chunks_keyset, "get_supabase_data_in_chunks (keyset)"),
+        ("chunks_keyset_concurrent", chunks_keyset_concurrent, "get_supabase_data_in_chunks (keyset, parallel)"),
+        ("sync_cold", sync_cold, "store.sync_table, lege store"),
+        ("sync_incremental", sync_incremental, "store.sync_table, 1 nieuwe snapshot"),
+        ("load_fx_window", load_fx_window, "load_data (pagina 1)"),
+        ("load_sp500", load_sp500, "get_supabase_data_in_chunks (pagina 5)"),
+        ("catalog_cold", catalog_cold, "get_unique_values / get_unique_values_chunked"),
+        ("chain_build", chain_build, "-"),
+        ("chain_attach", chain_attach, "-"),
+        ("greeks_snapshot", greeks_snapshot, "-"),
+        ("chain_slices", chain_slices, "fetch_filtered_data / fetch_filtered_option_data (200x)"),
+        ("chain_ladders", chain_ladders, "fetch_filtered_option_data per serie (240x)"),
+    ], cache
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--option-rows", type=int, default=10_000)
+    parser.add_argument("--fx-days", type=int, default=2500)
+    parser.add_argument("--sp500-days", type=int, default=2500)
+    parser.add_argument("--latency", type=float, default=0.0, help="kunstmatige vertraging per request (s)")
+    parser.add_argument("--only", nargs="*", help="alleen deze scenario's")
+    parser.add_argument("--output", help="JSON-lines bestand om resultaten aan toe te voegen")
+    args = parser.parse_args(argv)
+
+    sizes = {"fx_days": args.fx_days, "sp500_days": args.sp500_days, "option_rows": args.option_rows}
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    server = ctx.Process(target=_serve, args=(sizes, args.latency, queue), daemon=True)
+    server.start()
+    url = queue.get(timeout=600)
+
+    store_dir = tempfile.mkdtemp(prefix="fx-bench-")
+    os.environ.update({
+        "SUPABASE_URL": url,
+        "SUPABASE_KEY": "bench.fake.key",
+        "FX_STORE_DIR": store_dir,
+    })
+
+    results = []
+    try:
+        todo, _ = scenarios(store_dir, url)
+        print(f"{'scenario':<26} {'rijen':>10} {'tijd (s)':>9} {'requests':>9} {'MB':>9} {'piek MB':>8}  equivalent")
+        for name, fn, legacy in todo:
+            if args.only and name not in args.only:
+                continue
+            _call(url, "/_reset", "POST")
+            tracemalloc.start()
+            started = time.perf_counter()
+            rows = fn()
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            stats = _call(url, "/_stats")
+            result = {
+                "scenario": name, "rows": rows, "seconds": round(elapsed, 4),
+                "requests": stats["requests"], "bytes": stats["bytes"], "peak_bytes": peak,
+            }
+            results.append(result)
+            print(f"{name:<26} {rows:>10,} {elapsed:>9.3f} {stats['requests']:>9} "
+                  f"{stats['bytes'] / 1e6:>9.2f} {peak / 1e6:>8.1f}  {legacy}")
+    finally:
+        server.terminate()
+        shutil.rmtree(store_dir, ignore_errors=True)
+
+    if args.output:
+        meta = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "revision": _git_revision(), **sizes, "latency": args.latency}
+        with open(args.output, "a") as fh:
+            for result in results:
+                fh.write(json.dumps({**meta, **result}) + "\n")
+
+
+if __name__ == "__main__":
+    main()
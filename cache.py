@@ -0,0 +1,332 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pandas as pd
+
+import instrument
+import schema
+import shared
+import store
+
+# Stale-while-revalidate: een verlopen waarde wordt direct teruggegeven terwijl een achtergrondthread
+# hem ververst. Refreshes voor dezelfde sleutel worden samengevoegd, zodat gelijktijdige sessies
+# niet allemaal tegelijk Supabase of de store raken.
+REFRESH_WORKERS = int(os.getenv("FX_REFRESH_WORKERS", "2"))
+# Aantal opgebouwde grafieken dat per proces wordt bewaard
+FIGURE_CACHE_SIZE = int(os.getenv("FX_FIGURE_CACHE", "64"))
+# Geheugenbudget (MB) per bereik-cache (RangeCache)
+QUERY_CACHE_MB = float(os.getenv("FX_QUERY_CACHE_MB", "256"))
+
+_executor = ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix="swr-refresh")
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def run_once(key, fn, background: bool = False) -> Future:
+    """Voer fn één keer per sleutel tegelijk uit; andere aanroepers krijgen dezelfde Future."""
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is not None:
+            return future
+        future = _inflight[key] = Future()
+
+    def run():
+        try:
+            future.set_result(fn())
+        except Exception as exc:
+            future.set_exception(exc)
+        finally:
+            with _inflight_lock:
+                _inflight.pop(key, None)
+
+    if background:
+        _executor.submit(run)
+    else:
+        run()
+    return future
+
+
+def _copy(value):
+    # Zelfde semantiek als st.cache_data: aanroepers mogen het resultaat aanpassen. Een gedeeld
+    # (gemapt) frame krijgt een ondiepe kopie: kolommen vervangen kan, schrijven in de arrays niet
+    if isinstance(value, pd.DataFrame):
+        return value.copy(deep=not shared.is_shared(value))
+    return value
+
+
+def _make_key(args, kwargs):
+    key = (args, tuple(sorted(kwargs.items())))
+    try:
+        hash(key)
+    except TypeError:
+        key = repr(key)
+    return key
+
+
+class SWRCache:
+    def __init__(self, fn, ttl: float):
+        self.fn = fn
+        self.ttl = ttl
+        self.entries = {}
+        functools.update_wrapper(self, fn)
+
+    def _load(self, key, args, kwargs):
+        value = self.fn(*args, **kwargs)
+        self.entries[key] = (value, time.time())
+        return value
+
+    def __call__(self, *args, **kwargs):
+        key = _make_key(args, kwargs)
+        with instrument.span("cache", self.__name__) as event:
+            entry = self.entries.get(key)
+            if entry is None:
+                event["cache"] = "miss"
+                value = run_once((id(self), key), lambda: self._load(key, args, kwargs)).result()
+            else:
+                value, loaded_at = entry
+                event["cache"] = "hit"
+                if time.time() - loaded_at > self.ttl:
+                    event["cache"] = "stale"
+                    run_once((id(self), key), lambda: self._load(key, args, kwargs), background=True)
+            value = _copy(value)
+            if isinstance(value, pd.DataFrame):
+                event["rows"] = len(value)
+            return value
+
+    def refresh(self, *args, **kwargs) -> Future:
+        """Ververs één sleutel op de achtergrond (ook als die nog niet in de cache staat)."""
+        key = _make_key(args, kwargs)
+        return run_once((id(self), key), lambda: self._load(key, args, kwargs), background=True)
+
+    def mark_stale(self) -> None:
+        """Laat alle entries verlopen; de volgende aanroep per sleutel start een achtergrondrefresh."""
+        self.entries = {k: (v, 0.0) for k, (v, _) in self.entries.items()}
+
+    def clear(self) -> None:
+        self.entries = {}
+
+
+def swr(ttl: float = 3600):
+    def decorator(fn):
+        return SWRCache(fn, ttl)
+    return decorator
+
+
+class RangeCache:
+    """Stale-while-revalidate cache voor loaders met een (inclusief) datumbereik: fn(start, end, **params).
+
+    Per combinatie van params worden aaneengesloten segmenten bewaard. Een bereik dat binnen een
+    segment valt wordt lokaal gesneden; anders worden alleen de ontbrekende stukken opgehaald en met
+    overlappende of aangrenzende segmenten (binnen step) samengevoegd. Segmenten worden LRU
+    verwijderd zodra het geheugenbudget wordt overschreden. None betekent onbegrensd.
+    """
+
+    def __init__(self, fn, column: str, ttl: float, budget_mb: float = QUERY_CACHE_MB, step=pd.Timedelta(days=1)):
+        self.fn = fn
+        self.column = column
+        self.ttl = ttl
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.step = step
+        # (params, lo, hi) -> (frame, geladen op, bytes), in LRU-volgorde
+        self.segments = OrderedDict()
+        self.lock = threading.Lock()
+        functools.update_wrapper(self, fn)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(nbytes for _, _, nbytes in self.segments.values())
+
+    def _slice(self, df: pd.DataFrame, lo, hi, lo_open: bool = False, hi_open: bool = False) -> pd.DataFrame:
+        values = df[self.column]
+        i = values.searchsorted(lo, "right" if lo_open else "left") if lo is not _MIN else 0
+        j = values.searchsorted(hi, "left" if hi_open else "right") if hi is not _MAX else len(df)
+        return df if (i, j) == (0, len(df)) else df.iloc[i:j]
+
+    def _touching(self, pk, lo, hi) -> list:
+        # Segmenten die [lo, hi] overlappen of er binnen step op aansluiten, oplopend op begin
+        return sorted(
+            (k for k in self.segments if k[0] == pk and _sub(k[1], self.step) <= hi and _add(k[2], self.step) >= lo),
+            key=lambda k: k[1],
+        )
+
+    def _fetch(self, lo, hi, params) -> pd.DataFrame:
+        df = self.fn(None if lo is _MIN else lo, None if hi is _MAX else hi, **params)
+        if df.empty or df[self.column].is_monotonic_increasing:
+            return df
+        return df.sort_values(self.column, kind="stable").reset_index(drop=True)
+
+    def _store(self, pk, lo, hi, df: pd.DataFrame, loaded_at: float) -> None:
+        """Vervang [lo, hi] door df en voeg samen met de segmenten eromheen."""
+        with self.lock:
+            touching = self._touching(pk, lo, hi)
+            before, after = [], []
+            new_lo, new_hi = lo, hi
+            for key in touching:
+                frame, seg_loaded, _ = self.segments.pop(key)
+                if key[1] < lo:
+                    before.append(self._slice(frame, _MIN, lo, hi_open=True))
+                    new_lo = min(new_lo, key[1])
+                    loaded_at = min(loaded_at, seg_loaded)
+                if key[2] > hi:
+                    after.append(self._slice(frame, hi, _MAX, lo_open=True))
+                    new_hi = max(new_hi, key[2])
+                    loaded_at = min(loaded_at, seg_loaded)
+            parts = [p for p in before + [df] + after if not p.empty]
+            merged = pd.concat(parts, ignore_index=True) if len(parts) > 1 else df
+            self.segments[(pk, new_lo, new_hi)] = (merged, loaded_at, schema.memory_footprint(merged))
+            # LRU: oudste segmenten eruit tot het budget weer klopt (het nieuwe segment blijft staan)
+            total = self.nbytes
+            while total > self.budget and len(self.segments) > 1:
+                _, (_, _, nbytes) = self.segments.popitem(last=False)
+                total -= nbytes
+
+    def _refresh_segment(self, key) -> None:
+        pk, lo, hi = key
+        self._store(pk, lo, hi, self._fetch(lo, hi, dict(pk)), time.time())
+
+    def __call__(self, start=None, end=None, **params):
+        pk = tuple(sorted(params.items()))
+        lo = _MIN if start is None else pd.Timestamp(start)
+        hi = _MAX if end is None else pd.Timestamp(end)
+        with instrument.span("cache", self.__name__) as event:
+            with self.lock:
+                overlapping = [k for k in self._touching(pk, lo, hi) if k[1] <= hi and k[2] >= lo]
+                segments = {k: self.segments[k] for k in overlapping}
+                container = next((k for k in overlapping if k[1] <= lo and k[2] >= hi), None)
+                if container is not None:
+                    self.segments.move_to_end(container)
+
+            if container is not None:
+                frame, loaded_at, _ = segments[container]
+                event["cache"] = "hit"
+                if time.time() - loaded_at > self.ttl:
+                    event["cache"] = "stale"
+                    run_once((id(self), container), lambda: self._refresh_segment(container), background=True)
+                result = self._slice(frame, lo, hi)
+            else:
+                # Alleen de gaten tussen de overlappende segmenten ophalen; cursor is het eerste
+                # punt dat nog niet gedekt is (exclusief als cursor_open)
+                event["cache"] = "partial" if overlapping else "miss"
+                parts, cursor, cursor_open, loaded_at = [], lo, False, time.time()
+                for key in overlapping:
+                    frame, seg_loaded, _ = segments[key]
+                    if key[1] > cursor:
+                        parts.append(self._slice(self._fetch(cursor, key[1], params), cursor, key[1], cursor_open, True))
+                    parts.append(self._slice(frame, lo, hi))
+                    cursor, cursor_open, loaded_at = key[2], True, min(loaded_at, seg_loaded)
+                if cursor < hi or not cursor_open:
+                    parts.append(self._slice(self._fetch(cursor, hi, params), cursor, hi, cursor_open))
+                result = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+                self._store(pk, lo, hi, result, loaded_at)
+            result = _copy(result)
+            event["rows"] = len(result)
+            return result
+
+    def refresh(self, start=None, end=None, **params) -> Future:
+        """Haal een bereik op de achtergrond opnieuw op (ook als het nog niet in de cache staat)."""
+        pk = tuple(sorted(params.items()))
+        key = (pk, _MIN if start is None else pd.Timestamp(start), _MAX if end is None else pd.Timestamp(end))
+        return run_once((id(self), key), lambda: self._refresh_segment(key), background=True)
+
+    def mark_stale(self) -> None:
+        """Laat alle segmenten verlopen; de volgende aanroep per segment start een achtergrondrefresh."""
+        with self.lock:
+            self.segments = OrderedDict((k, (df, 0.0, nbytes)) for k, (df, _, nbytes) in self.segments.items())
+
+    def clear(self) -> None:
+        with self.lock:
+            self.segments.clear()
+
+
+_MIN, _MAX = pd.Timestamp.min, pd.Timestamp.max
+
+
+def _add(ts, step):
+    return ts if ts is _MAX else min(ts + step, _MAX) if ts < _MAX - step else _MAX
+
+
+def _sub(ts, step):
+    return ts if ts is _MIN else ts - step if ts > _MIN + step else _MIN
+
+
+def ranges(column: str, ttl: float = 3600, **kwargs):
+    def decorator(fn):
+        return RangeCache(fn, column, ttl, **kwargs)
+    return decorator
+
+
+class FigureCache:
+    """LRU-cache voor opgebouwde grafieken (zie plotly_chart: bewaard als geserialiseerde spec).
+
+    De sleutel moet alles bevatten waar de figuur van afhangt (selectie, periode, instellingen en
+    een dataversie zoals store.get_version), zodat een rerun met dezelfde invoer niets opnieuw opbouwt.
+    """
+
+    def __init__(self, maxsize: int = FIGURE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, build, name: str = "figuur"):
+        with instrument.span("cache", name) as event:
+            with self.lock:
+                figure = self.entries.get(key)
+                if figure is not None:
+                    self.entries.move_to_end(key)
+            if figure is not None:
+                event["cache"] = "hit"
+                return figure
+            event["cache"] = "miss"
+            figure = build()
+            with self.lock:
+                self.entries[key] = figure
+                while len(self.entries) > self.maxsize:
+                    self.entries.popitem(last=False)
+            return figure
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+
+figures = FigureCache()
+
+# Zelfde config als st.plotly_chart zonder extra argumenten
+_PLOTLY_CONFIG = json.dumps({"showLink": False, "linkText": False})
+
+
+def _plotly_spec(figure) -> str:
+    import plotly.utils
+
+    return json.dumps(figure, cls=plotly.utils.PlotlyJSONEncoder)
+
+
+def plotly_chart(key, build, name: str = "figuur", use_container_width: bool = True):
+    """Toon een grafiek uit de cache zonder hem per rerun opnieuw te valideren en te serialiseren.
+
+    st.plotly_chart zet elke figuur bij elke rerun om naar een gevalideerde go.Figure en JSON. Hier
+    gebeurt dat één keer bij het vullen van de cache; daarna wordt de bewaarde spec direct als
+    PlotlyChart-element verstuurd (zelfde proto en theme als st.plotly_chart in Streamlit 1.28).
+    """
+    import streamlit as st
+    from streamlit.proto.PlotlyChart_pb2 import PlotlyChart
+
+    proto = PlotlyChart()
+    proto.use_container_width = use_container_width
+    proto.figure.spec = figures.get(key, lambda: _plotly_spec(build()), name)
+    proto.figure.config = _PLOTLY_CONFIG
+    proto.theme = "streamlit"
+    return st._main._enqueue("plotly_chart", proto)
+
+
+def ensure_synced(table_name: str) -> None:
+    """Blokkeer alleen bij een lege store; anders wordt de sync op de achtergrond gestart."""
+    if store.get_watermark(table_name) is None:
+        run_once(("sync", table_name), lambda: store.sync_table(table_name, force=True)).result()
+    else:
+        run_once(("sync", table_name), lambda: store.sync_table(table_name), background=True)
@@ -0,0 +1,141 @@
+import json
+import os
+import threading
+
+import pandas as pd
+
+import store
+from cache import ensure_synced
+
+# Kleine index met de distinct filterwaarden van een optietabel, opgebouwd uit de lokale store.
+# combos: unieke (type, expiration, strike) met eerste/laatste peildatum
+# snapshots: unieke snapshot_date met het aantal rijen per snapshot
+# De catalogus hoort bij een dataversie van de store (store.get_version); bijlezen gebeurt vanaf
+# de watermark van de vorige keer, zodat een aangevulde snapshot opnieuw wordt geteld.
+COMBO_COLUMNS = ["type", "expiration", "strike"]
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def _catalog_dir(table_name: str):
+    return store.STORE_DIR / table_name / "_catalog"
+
+
+def _read(table_name: str):
+    path = _catalog_dir(table_name)
+    if not (path / "meta.json").exists():
+        return {}, pd.DataFrame(), pd.DataFrame()
+    meta = json.loads((path / "meta.json").read_text())
+    return meta, pd.read_parquet(path / "combos.parquet"), pd.read_parquet(path / "snapshots.parquet")
+
+
+def _write(table_name: str, meta: dict, combos: pd.DataFrame, snapshots: pd.DataFrame) -> None:
+    path = _catalog_dir(table_name)
+    path.mkdir(parents=True, exist_ok=True)
+    for name, df in [("combos", combos), ("snapshots", snapshots)]:
+        target = path / f"{name}.parquet"
+        tmp = store.temp_path(target)
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, target)
+    tmp = store.temp_path(path / "meta.json")
+    tmp.write_text(json.dumps(meta))
+    os.replace(tmp, path / "meta.json")
+
+
+def _merge(combos, snapshots, rows: pd.DataFrame):
+    rows = rows.dropna(subset=COMBO_COLUMNS)
+    new_combos = rows.groupby(COMBO_COLUMNS, as_index=False, observed=True).agg(
+        first_seen=("snapshot_date", "min"), last_seen=("snapshot_date", "max")
+    )
+    if not combos.empty:
+        new_combos = pd.concat([combos, new_combos]).groupby(COMBO_COLUMNS, as_index=False, observed=True).agg(
+            first_seen=("first_seen", "min"), last_seen=("last_seen", "max")
+        )
+    new_snapshots = rows.groupby("snapshot_date", as_index=False).size().rename(columns={"size": "rows"})
+    if not snapshots.empty:
+        # De snapshot op de watermark wordt bij een sync volledig opnieuw gelezen: nieuwe telling wint
+        snapshots = snapshots[~snapshots["snapshot_date"].isin(new_snapshots["snapshot_date"])]
+        new_snapshots = pd.concat([snapshots, new_snapshots])
+    return new_combos, new_snapshots.sort_values("snapshot_date").reset_index(drop=True)
+
+
+def refresh(table_name: str = "spx_options2"):
+    """Werk de catalogus bij met alleen de snapshots die sinds de vorige refresh in de store zijn gekomen of zijn aangevuld."""
+    ensure_synced(table_name)
+    version = store.get_version(table_name)
+    cached = _cache.get(table_name)
+    if cached and cached[0] == version:
+        return cached[1], cached[2]
+
+    # Eén refresh tegelijk, ook over processen heen; daarna opnieuw lezen wat een ander al schreef
+    with _lock, store.file_lock(_catalog_dir(table_name).with_suffix(".lock")):
+        version = store.get_version(table_name)
+        cached = _cache.get(table_name)
+        if cached and cached[0] == version:
+            return cached[1], cached[2]
+        meta, combos, snapshots = _read(table_name)
+        if version is not None and meta.get("version") != version:
+            watermark = store.get_watermark(table_name)
+            rows = store.load_table(
+                table_name,
+                start=meta.get("watermark"),
+                columns=COMBO_COLUMNS,
+            )
+            combos, snapshots = _merge(combos, snapshots, rows)
+            _write(table_name, {"watermark": watermark.isoformat(), "version": version}, combos, snapshots)
+
+        _cache[table_name] = (version, combos, snapshots)
+    return combos, snapshots
+
+
+def _filter(combos: pd.DataFrame, type_optie=None, expiration=None, strike=None) -> pd.DataFrame:
+    if type_optie:
+        combos = combos[combos["type"] == type_optie]
+    if expiration is not None:
+        combos = combos[combos["expiration"] == expiration]
+    if strike is not None:
+        combos = combos[combos["strike"] == strike]
+    return combos
+
+
+def snapshot_dates(table_name: str = "spx_options2") -> list:
+    _, snapshots = refresh(table_name)
+    return snapshots["snapshot_date"].tolist() if not snapshots.empty else []
+
+
+def types(table_name: str = "spx_options2") -> list:
+    combos, _ = refresh(table_name)
+    return sorted(combos["type"].unique().tolist()) if not combos.empty else []
+
+
+def expirations(table_name: str = "spx_options2", type_optie=None, strike=None) -> list:
+    combos, _ = refresh(table_name)
+    if combos.empty:
+        return []
+    return sorted(_filter(combos, type_optie, strike=strike)["expiration"].unique().tolist())
+
+
+def strikes(table_name: str = "spx_options2", type_optie=None, expiration=None) -> list:
+    combos, _ = refresh(table_name)
+    if combos.empty:
+        return []
+    return sorted(_filter(combos, type_optie, expiration=expiration)["strike"].unique().tolist())
+
+
+def series_bounds(table_name: str = "spx_options2", type_optie=None, expiration=None, strike=None):
+    """Eerste en laatste peildatum van één optieserie, of None als de serie niet bestaat."""
+    combos, _ = refresh(table_name)
+    if combos.empty:
+        return None
+    match = _filter(combos, type_optie, expiration, strike)
+    if match.empty:
+        return None
+    return match["first_seen"].min(), match["last_seen"].max()
+
+
+def combinations(table_name: str = "spx_options2", type_optie=None) -> pd.DataFrame:
+    combos, _ = refresh(table_name)
+    if combos.empty:
+        return combos
+    return _filter(combos, type_optie).sort_values(COMBO_COLUMNS).reset_index(drop=True)
@@ -0,0 +1,199 @@
+import threading
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+import instrument
+import schema
+import shared
+import store
+
+# In-process index over de optieketen. Alle kolommen staan als aaneengesloten arrays gesorteerd op
+# (snapshot, type, expiration, strike); een tweede permutatie sorteert op (type, strike, expiration,
+# snapshot). Elke slice is een reeks binary searches op gesorteerde sleutels plus één kopie van k rijen.
+# De gesorteerde keten met sleutels en permutatie staat in de gedeelde cache (shared.py): één worker
+# bouwt hem per dataversie van de store, de andere koppelen hem zonder kopie.
+PRIMARY = ["snapshot_date", "type", "expiration", "strike"]
+SECONDARY = ["type", "strike", "expiration", "snapshot_date"]
+
+_chains = {}
+_chains_lock = threading.Lock()
+
+
+def _ns(value) -> int:
+    # Tijdstippen zonder tijdzone gelden als UTC
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize("UTC")
+    return ts.value
+
+
+def _narrow(keys: dict, lo: int, hi: int, column: str, value, upper=None):
+    # keys[column] is gesorteerd binnen [lo, hi) omdat alle voorgaande sleutels daar constant zijn
+    arr = keys[column][lo:hi]
+    left = np.searchsorted(arr, value, "left")
+    right = np.searchsorted(arr, value if upper is None else upper, "right")
+    return lo + int(left), lo + int(right)
+
+
+@dataclass(frozen=True)
+class _Index:
+    # Alles wat een lezer nodig heeft; refresh() vervangt het geheel met één toewijzing, zodat een
+    # lezer die het één keer per aanroep ophaalt nooit een half bijgewerkte keten ziet
+    data: dict = field(default_factory=dict)
+    type_codes: dict = field(default_factory=dict)
+    order: np.ndarray = field(default_factory=lambda: np.array([], dtype=np.int64))
+    primary: dict = field(default_factory=dict)
+    secondary: dict = field(default_factory=dict)
+
+    def frame(self, idx) -> pd.DataFrame:
+        return pd.DataFrame({c: v[idx] for c, v in self.data.items()})
+
+    def type_code(self, type_optie):
+        return self.type_codes.get(type_optie, -1)
+
+
+def _strike_range(index: _Index, type_optie, strike):
+    # Blok van één (type, strike) in de tweede permutatie
+    lo, hi = _narrow(index.secondary, 0, len(index.order), "type", index.type_code(type_optie))
+    return _narrow(index.secondary, lo, hi, "strike", int(strike))
+
+
+class OptionChain:
+    def __init__(self, table_name: str = "spx_options2", columns=None):
+        self.table_name = table_name
+        self.columns = columns or schema.columns("option_series")
+        # watermark is het beginpunt voor het bijlezen, version (store.get_version) bepaalt of dat nodig is
+        self.watermark = None
+        self.version = None
+        self.lock = threading.Lock()
+        self._index = _Index()
+
+    @property
+    def data(self) -> dict:
+        return self._index.data
+
+    @property
+    def type_codes(self) -> dict:
+        return self._index.type_codes
+
+    def __len__(self) -> int:
+        return len(self._index.order)
+
+    def _encode(self, df: pd.DataFrame) -> dict:
+        types = df["type"].astype(str).to_numpy()
+        codes = dict(self._index.type_codes)
+        for t in np.unique(types):
+            codes.setdefault(t, len(codes))
+        return {
+            "snapshot_date": df["snapshot_date"].to_numpy(dtype="datetime64[ns]").astype(np.int64),
+            "type": np.array([codes[t] for t in types], dtype=np.int8) if len(types) else np.array([], dtype=np.int8),
+            "expiration": df["expiration"].to_numpy(dtype="datetime64[ns]").astype(np.int64),
+            "strike": df["strike"].to_numpy(dtype=np.int64),
+        }
+
+    def _build(self, df: pd.DataFrame) -> pd.DataFrame:
+        # Keten in primaire volgorde, met de sleutels (_p_*), de tweede permutatie (_order) en de
+        # daarin gesorteerde sleutels (_s_*) als extra kolommen
+        keys = self._encode(df)
+        order = np.lexsort([keys[c] for c in reversed(PRIMARY)])
+        out = df.iloc[order].reset_index(drop=True)
+        primary = {c: keys[c][order] for c in PRIMARY}
+        secondary_order = np.lexsort([primary[c] for c in reversed(SECONDARY)])
+        extra = {f"_p_{c}": v for c, v in primary.items()}
+        extra["_order"] = secondary_order
+        extra.update({f"_s_{c}": primary[c][secondary_order] for c in SECONDARY})
+        return pd.concat([out, pd.DataFrame(extra)], axis=1)
+
+    def _attach(self, frame: pd.DataFrame) -> None:
+        data = {c: frame[c].array for c in frame.columns if not c.startswith("_")}
+        primary = {c: frame[f"_p_{c}"].to_numpy() for c in PRIMARY}
+        # Typecodes zoals de bouwende worker ze heeft toegekend
+        codes, first = np.unique(primary["type"], return_index=True)
+        self._index = _Index(
+            data=data,
+            type_codes={str(data["type"][i]): int(code) for code, i in zip(codes, first)},
+            order=frame["_order"].to_numpy(),
+            primary=primary,
+            secondary={c: frame[f"_s_{c}"].to_numpy() for c in SECONDARY},
+        )
+
+    def _load(self) -> pd.DataFrame:
+        new = store.load_table(self.table_name, start=self.watermark, columns=self.columns)
+        index = self._index
+        if self.watermark is not None and len(index.order):
+            # Nieuwe snapshots komen in de primaire volgorde achteraan; de snapshot op de oude
+            # watermark wordt vervangen omdat de sync die opnieuw heeft gelezen
+            cut = int(np.searchsorted(index.primary["snapshot_date"], _ns(self.watermark), "left"))
+            old = pd.DataFrame({c: v[:cut] for c, v in index.data.items()})
+            new = schema.coerce(self.table_name, pd.concat([old, new[list(index.data)]], ignore_index=True))
+        return self._build(new)
+
+    def refresh(self) -> "OptionChain":
+        """Laad alleen de snapshots die sinds de vorige refresh in de store zijn gekomen of zijn aangevuld."""
+        version = store.get_version(self.table_name)
+        if version is None or version == self.version:
+            return self
+        with self.lock:
+            if version == self.version:
+                return self
+            with instrument.span("compute", f"chain refresh {self.table_name}") as event:
+                watermark = store.get_watermark(self.table_name)
+                frame = shared.get_frame(f"chain_{self.table_name}", version, self._load)
+                self._attach(frame)
+                self.watermark, self.version = watermark, version
+                event["rows"] = len(frame)
+        return self
+
+    def snapshot(self, snapshot_date, type_optie=None) -> pd.DataFrame:
+        """Volledige keten (alle expiraties en strikes) van één peildatum."""
+        index = self._index
+        lo, hi = _narrow(index.primary, 0, len(index.order), "snapshot_date", _ns(snapshot_date))
+        if type_optie:
+            lo, hi = _narrow(index.primary, lo, hi, "type", index.type_code(type_optie))
+        return index.frame(slice(lo, hi))
+
+    def term_structure(self, snapshot_date, type_optie, strike) -> pd.DataFrame:
+        """Eén strike over alle expiraties binnen één peildatum."""
+        index = self._index
+        lo, hi = _strike_range(index, type_optie, strike)
+        snaps = index.secondary["snapshot_date"][lo:hi]
+        return index.frame(index.order[lo:hi][snaps == _ns(snapshot_date)])
+
+    def strike_history(self, type_optie, strike, snapshot_dates=None) -> pd.DataFrame:
+        """Eén strike (alle expiraties) over de peildata, optioneel beperkt tot snapshot_dates."""
+        index = self._index
+        lo, hi = _strike_range(index, type_optie, strike)
+        idx = index.order[lo:hi]
+        if snapshot_dates is not None:
+            wanted = pd.to_datetime(list(snapshot_dates), utc=True).as_unit("ns").asi8
+            idx = idx[np.isin(index.secondary["snapshot_date"][lo:hi], wanted)]
+        return index.frame(np.sort(idx))
+
+    def series(self, type_optie, expiration, strike, start=None, end=None) -> pd.DataFrame:
+        """Eén optieserie door de tijd, optioneel begrensd op peildatum."""
+        return self.series_many([(type_optie, expiration, strike)], start, end)
+
+    def series_many(self, series, start=None, end=None) -> pd.DataFrame:
+        """Meerdere series [(type, expiration, strike), ...] in één slice: per serie een aaneengesloten
+        blok in de tweede permutatie, samen met één kopie opgehaald (volgorde van series, dan peildatum)."""
+        index = self._index
+        first = _ns(start) if start is not None else np.iinfo(np.int64).min
+        last = _ns(end) if end is not None else np.iinfo(np.int64).max
+        ranges = []
+        for t, e, k in series:
+            lo, hi = _strike_range(index, t, k)
+            lo, hi = _narrow(index.secondary, lo, hi, "expiration", pd.Timestamp(e).value)
+            ranges.append(_narrow(index.secondary, lo, hi, "snapshot_date", first, upper=last))
+        idx = np.concatenate([index.order[lo:hi] for lo, hi in ranges]) if ranges else np.array([], dtype=np.int64)
+        return index.frame(idx)
+
+
+def get_chain(table_name: str = "spx_options2") -> OptionChain:
+    """Gedeelde keten per proces (pagina 3 en 4), bijgewerkt tot de laatste dataversie van de store."""
+    with _chains_lock:
+        chain = _chains.get(table_name)
+        if chain is None:
+            chain = _chains[table_name] = OptionChain(table_name)
+    return chain.refresh()
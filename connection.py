@@ -0,0 +1,143 @@
+import os
+import random
+import threading
+import time
+
+import httpx
+from dotenv import load_dotenv
+from postgrest.exceptions import APIError
+from supabase import Client, ClientOptions, create_client
+
+import instrument
+
+load_dotenv()
+
+# Eén Supabase-client per proces: de onderliggende httpx-sessie (keep-alive, connection pool)
+# wordt door alle pagina's, utils en de store gedeeld in plaats van per rerun opnieuw opgebouwd.
+REQUEST_TIMEOUT = float(os.getenv("FX_REQUEST_TIMEOUT", "20"))
+MAX_RETRIES = int(os.getenv("FX_MAX_RETRIES", "4"))
+BACKOFF_BASE = float(os.getenv("FX_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("FX_BACKOFF_MAX", "8"))
+MAX_CONCURRENT_REQUESTS = int(os.getenv("FX_MAX_CONCURRENT_REQUESTS", "8"))
+BREAKER_THRESHOLD = int(os.getenv("FX_BREAKER_THRESHOLD", "5"))
+BREAKER_RESET = float(os.getenv("FX_BREAKER_RESET", "30"))
+
+_client = None
+_client_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """Stopt requests na herhaalde fouten; na reset_timeout mag één proefrequest door."""
+
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def before_request(self) -> None:
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                raise CircuitOpenError("Supabase tijdelijk niet bereikbaar, probeer het later opnieuw.")
+            # half-open: laat dit request door als proef
+            self.opened_at = time.monotonic()
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+breaker = CircuitBreaker(BREAKER_THRESHOLD, BREAKER_RESET)
+
+
+def _credentials():
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_KEY")
+    if not url or not key:
+        try:
+            import streamlit as st
+            url = url or st.secrets["SUPABASE_URL"]
+            key = key or st.secrets["SUPABASE_KEY"]
+        except Exception:
+            pass
+    return url, key
+
+
+def is_configured() -> bool:
+    url, key = _credentials()
+    return bool(url and key)
+
+
+def get_client() -> Client:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                url, key = _credentials()
+                client = create_client(url, key, options=ClientOptions(postgrest_client_timeout=REQUEST_TIMEOUT))
+                client.postgrest.session.event_hooks["response"].append(_count_bytes)
+                _client = client
+    return _client
+
+
+def _count_bytes(response) -> None:
+    # Payloadgrootte bij het lopende query-event optellen (de hook draait in de thread van execute)
+    event = instrument.current()
+    if event is not None and event["kind"] == "query":
+        response.read()
+        event["bytes"] = event.get("bytes", 0) + len(response.content)
+
+
+def table(name: str):
+    return get_client().table(name)
+
+
+def _is_transient(exc: Exception) -> bool:
+    if isinstance(exc, httpx.TransportError):
+        return True
+    if isinstance(exc, APIError):
+        code = str(exc.code or "")
+        # 5xx, rate limiting en statement timeouts
+        return code.startswith("5") or code in ("429", "57014")
+    return False
+
+
+def execute(query, page: int | None = None):
+    """Voer een PostgREST-query uit met concurrency-limiet, retries met jitter en circuit breaker.
+
+    page is het paginanummer binnen een gepagineerde lus en wordt alleen voor de trace gebruikt.
+    """
+    name = getattr(query, "path", "").rsplit("/", 1)[-1] or "query"
+    with instrument.span("query", name, page_no=page) as event:
+        for attempt in range(MAX_RETRIES + 1):
+            event["attempts"] = attempt + 1
+            breaker.before_request()
+            try:
+                with _slots:
+                    response = query.execute()
+            except Exception as exc:
+                if not _is_transient(exc):
+                    raise
+                breaker.record_failure()
+                if attempt == MAX_RETRIES:
+                    raise
+                time.sleep(random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)))
+                continue
+            breaker.record_success()
+            event["rows"] = len(response.data) if isinstance(response.data, list) else None
+            return response
@@ -0,0 +1,162 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+import loaders
+
+# Rolling correlatie en beta tussen alle FX-paren en de S&P 500 in één gevectoriseerde doorloop.
+# Per dag worden cumulatieve sommen van de rendementen en hun onderlinge producten bijgehouden;
+# de som over elk venster is dan het verschil van twee cumulatieve rijen. Ontbrekende waarden
+# worden paarsgewijs uitgesloten (eigen telling per combinatie).
+WINDOWS = (20, 60, 120, 250)
+SPX = "SPX"
+COLUMNS = [*loaders.FX_PAIRS, SPX]
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def price_frame(fx: pd.DataFrame, sp500: pd.DataFrame) -> pd.DataFrame:
+    """Slotkoersen van de paren en de S&P 500 op de gemeenschappelijke handelsdagen."""
+    if fx.empty or sp500.empty:
+        return pd.DataFrame(columns=["date", *COLUMNS])
+    spx = sp500[["date", "close"]].rename(columns={"close": SPX})
+    return fx[["date", *loaders.FX_PAIRS]].merge(spx, on="date", how="inner").sort_values("date").reset_index(drop=True)
+
+
+class CorrelationEngine:
+    """Rolling correlatie- en betamatrices voor meerdere vensters, incrementeel bijgewerkt.
+
+    update() verlengt de cumulatieve sommen en de resultaten per venster met alleen de nieuwe dagen.
+    beta[i, j] is de gevoeligheid van serie i voor serie j (cov(i, j) / var(j)).
+    """
+
+    def __init__(self, columns=COLUMNS, windows=WINDOWS, min_fraction: float = 0.5):
+        self.columns = list(columns)
+        self.windows = tuple(windows)
+        self.min_fraction = min_fraction
+        self.lock = threading.Lock()
+        self._state = self._reset()
+
+    def _reset(self) -> tuple:
+        # Schrijfstate (alleen onder self.lock) opnieuw beginnen; geeft een lege leesstate terug
+        k = len(self.columns)
+        self._last = np.full(k, np.nan)
+        # Cumulatieve sommen met een nulrij vooraan: [aantal, x_i*v_j, x_i^2*v_j, x_i*x_j]
+        self._cum = {name: np.zeros((1, k, k)) for name in ("n", "x", "xx", "xy")}
+        return (
+            np.array([], dtype="datetime64[ns]"),
+            {w: np.empty((0, k, k)) for w in self.windows},
+            {w: np.empty((0, k, k)) for w in self.windows},
+        )
+
+    # Lezers zien (dates, corr, beta) als één geheel: update() vervangt het met één toewijzing
+    @property
+    def dates(self) -> np.ndarray:
+        return self._state[0]
+
+    @property
+    def corr(self) -> dict:
+        return self._state[1]
+
+    @property
+    def beta(self) -> dict:
+        return self._state[2]
+
+    def _returns(self, prices: np.ndarray) -> np.ndarray:
+        # Log-rendement t.o.v. de laatst bekende koers per serie
+        prev = np.vstack([self._last, prices[:-1]])
+        prev = pd.DataFrame(prev).ffill().to_numpy()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = np.log(prices / prev)
+        last_valid = pd.DataFrame(prices).ffill().to_numpy()[-1]
+        self._last = np.where(np.isnan(last_valid), self._last, last_valid)
+        return np.where(np.isfinite(returns), returns, np.nan)
+
+    def _window_stats(self, window: int, lo: int, hi: int):
+        # Sommen over [t - window + 1, t] voor t in [lo, hi)
+        end = np.arange(lo, hi) + 1
+        start = np.maximum(end - window, 0)
+        return {name: cum[end] - cum[start] for name, cum in self._cum.items()}
+
+    def _compute(self, window: int, lo: int, hi: int):
+        s = self._window_stats(window, lo, hi)
+        n, sx, sy = s["n"], s["x"], np.swapaxes(s["x"], 1, 2)
+        sxx, syy = s["xx"], np.swapaxes(s["xx"], 1, 2)
+        cov = n * s["xy"] - sx * sy
+        var_x = n * sxx - sx ** 2
+        var_y = n * syy - sy ** 2
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = np.clip(cov / np.sqrt(var_x * var_y), -1.0, 1.0)
+            beta = cov / var_y
+        enough = n >= max(3, int(window * self.min_fraction))
+        return np.where(enough, corr, np.nan), np.where(enough, beta, np.nan)
+
+    def update(self, df: pd.DataFrame, date_column: str = "date") -> int:
+        """Verwerk nieuwe dagen uit een koersframe (zie price_frame); herberekent alles als de historie is gewijzigd."""
+        dates = df[date_column].to_numpy(dtype="datetime64[ns]")
+        with self.lock:
+            state = self._state
+            if len(state[0]):
+                known = dates[dates <= state[0][-1]]
+                if len(known) != len(state[0]) or not np.array_equal(known, state[0]):
+                    state = self._reset()
+            old_dates, corr, beta = state
+            new = dates > old_dates[-1] if len(old_dates) else np.ones(len(dates), dtype=bool)
+            if not new.any():
+                self._state = state
+                return 0
+
+            r = self._returns(df.loc[new, self.columns].to_numpy(dtype=np.float64))
+            valid = (~np.isnan(r)).astype(np.float64)
+            x = np.nan_to_num(r)
+            increments = {
+                "n": valid[:, :, None] * valid[:, None, :],
+                "x": x[:, :, None] * valid[:, None, :],
+                "xx": (x ** 2)[:, :, None] * valid[:, None, :],
+                "xy": x[:, :, None] * x[:, None, :],
+            }
+            for name, inc in increments.items():
+                cum = self._cum[name]
+                self._cum[name] = np.concatenate([cum, cum[-1] + np.cumsum(inc, axis=0)])
+
+            lo, hi = len(old_dates), len(old_dates) + len(r)
+            corr, beta = dict(corr), dict(beta)
+            for window in self.windows:
+                c, b = self._compute(window, lo, hi)
+                corr[window] = np.concatenate([corr[window], c])
+                beta[window] = np.concatenate([beta[window], b])
+            self._state = (np.concatenate([old_dates, dates[new]]), corr, beta)
+            return len(r)
+
+    def _snapshot(self, kind: str):
+        dates, corr, beta = self._state
+        return dates, corr if kind == "corr" else beta
+
+    def matrix(self, window: int, date=None, kind: str = "corr") -> pd.DataFrame:
+        """Matrix op de laatste handelsdag tot en met date (standaard de meest recente)."""
+        dates, results = self._snapshot(kind)
+        if not len(dates):
+            return pd.DataFrame(index=self.columns, columns=self.columns, dtype=float)
+        t = len(dates) - 1 if date is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(date)), "right")) - 1
+        t = max(t, 0)
+        return pd.DataFrame(results[window][t], index=self.columns, columns=self.columns)
+
+    def series(self, window: int, a: str, b: str, start=None, end=None, kind: str = "corr") -> pd.DataFrame:
+        """Tijdreeks van één combinatie binnen [start, end]."""
+        dates, results = self._snapshot(kind)
+        lo = 0 if start is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(start)), "left"))
+        hi = len(dates) if end is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(end)), "right"))
+        i, j = self.columns.index(a), self.columns.index(b)
+        return pd.DataFrame({"date": dates[lo:hi], "waarde": results[window][lo:hi, i, j]})
+
+
+def get_engine() -> CorrelationEngine:
+    """Gedeelde engine per proces, bijgewerkt met de laatste FX- en S&P-data uit de loaders."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = CorrelationEngine()
+    _engine.update(price_frame(loaders.load_fx(), loaders.load_sp500()))
+    return _engine
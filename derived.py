@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+# Afgeleide optiekolommen, één keer per snapshot berekend tijdens de store-sync en
+# naast de ruwe kolommen opgeslagen. Eén definitie van PPD voor alle pagina's:
+# bid gedeeld door het aantal hele dagen tot expiratie (alleen als dat > 0 is).
+
+
+def option_metrics(df: pd.DataFrame) -> pd.DataFrame:
+    snapshot = df["snapshot_date"]
+    expiration = df["expiration"]
+    if expiration.dt.tz is None:
+        expiration = expiration.dt.tz_localize("UTC")
+    days = (expiration - snapshot).dt.days
+    df["days_to_maturity"] = days.astype("Int32").array if days.isna().any() else days.to_numpy(dtype=np.int32)
+
+    bid = df["bid"].to_numpy(dtype=np.float64)
+    d = df["days_to_maturity"].to_numpy(dtype=np.float64, na_value=np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df["ppd"] = np.where(d > 0, bid / d, np.nan).astype(np.float32)
+
+    strike = df["strike"].to_numpy(dtype=np.float64, na_value=np.nan)
+    spot = df["underlying_price"].to_numpy(dtype=np.float64)
+    is_put = (df["type"] == "put").to_numpy()
+    intrinsic = np.where(is_put, np.clip(strike - spot, 0, None), np.clip(spot - strike, 0, None))
+    df["intrinsieke_waarde"] = intrinsic.astype(np.float32)
+    df["tijdswaarde"] = (df["last_price"].to_numpy(dtype=np.float64) - intrinsic).astype(np.float32)
+    return df
+
+
+METRICS = {
+    "spx_options2": option_metrics,
+}
+
+
+def add_metrics(table_name: str, df: pd.DataFrame) -> pd.DataFrame:
+    if df.empty or table_name not in METRICS:
+        return df
+    return METRICS[table_name](df)
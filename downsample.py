@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Ongeveer de pixelbreedte van een brede grafiek; kortere series worden ongewijzigd getoond
+MAX_POINTS = int(os.getenv("FX_CHART_POINTS", "1500"))
+
+
+def _numeric_x(x) -> np.ndarray:
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+    return x.astype(np.float64)
+
+
+def lttb_indices(x, y, n_out: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices van de n_out punten die de vorm van de lijn bewaren."""
+    x = _numeric_x(x)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    # NaN's tellen als 'geen hoogte': vervang door het gemiddelde zodat ze niet worden gekozen
+    y = np.where(np.isnan(y), np.nanmean(y) if np.isfinite(y).any() else 0.0, y)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_lo, nxt_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[nxt_lo:nxt_hi].mean() if nxt_hi > nxt_lo else x[-1]
+        avg_y = y[nxt_lo:nxt_hi].mean() if nxt_hi > nxt_lo else y[-1]
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def minmax_indices(y, n_buckets: int) -> np.ndarray:
+    """Per bucket de index van het minimum en maximum, zodat pieken zichtbaar blijven."""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if 2 * n_buckets >= n:
+        return np.arange(n)
+    size = int(np.ceil(n / n_buckets))
+    padded = np.full(size * int(np.ceil(n / size)), np.nan)
+    padded[:n] = y
+    blocks = padded.reshape(-1, size)
+    all_nan = np.isnan(blocks).all(axis=1)
+    filled_lo = np.where(np.isnan(blocks), np.inf, blocks)
+    filled_hi = np.where(np.isnan(blocks), -np.inf, blocks)
+    offsets = np.arange(len(blocks)) * size
+    lo = offsets + filled_lo.argmin(axis=1)
+    hi = offsets + filled_hi.argmax(axis=1)
+    idx = np.concatenate([lo[~all_nan], hi[~all_nan], offsets[all_nan]])
+    return np.unique(idx[idx < n])
+
+
+def lttb_frame(df: pd.DataFrame, x: str, y, n_out: int = MAX_POINTS) -> pd.DataFrame:
+    """Dun de rijen van df uit voor lijngrafieken; bij meerdere y-kolommen de vereniging van de punten."""
+    if len(df) <= n_out:
+        return df
+    columns = [y] if isinstance(y, str) else list(y)
+    per_column = max(n_out // len(columns), 3)
+    idx = np.unique(np.concatenate([lttb_indices(df[x].to_numpy(), df[c].to_numpy(), per_column) for c in columns]))
+    return df.iloc[idx]
+
+
+def minmax_frame(df: pd.DataFrame, y: str, n_out: int = MAX_POINTS) -> pd.DataFrame:
+    """Dun de rijen van df uit voor staafgrafieken met min/max per bucket."""
+    if len(df) <= n_out:
+        return df
+    return df.iloc[minmax_indices(df[y].to_numpy(), n_out // 2)]
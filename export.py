@@ -0,0 +1,188 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import instrument
+import loaders
+import schema
+import store
+
+# Exports worden pas op verzoek gemaakt en partitie voor partitie uit de lokale store geschreven,
+# zodat ook een jaar spx_options2 nooit in zijn geheel in het geheugen staat. Een voorbereid bestand
+# wordt per (tabel, selectie, formaat, dataversie) hergebruikt tot het na EXPORT_TTL wordt opgeruimd.
+EXPORT_DIR = store.STORE_DIR / "_exports"
+EXPORT_TTL = int(os.getenv("FX_EXPORT_TTL", "86400"))
+FORMATS = ("csv", "parquet")
+
+# Standaardkolommen en nabewerking per chunk
+VIEWS = {
+    "fx_rates": ("fx", loaders.add_fx_pairs),
+    "sp500_delta_view": ("sp500", None),
+    "spx_options2": ("option_series", None),
+}
+
+
+def option_filters(type_optie=None, expiration=None, strike=None) -> list | None:
+    """pyarrow-filters voor een selectie uit de optieketen."""
+    filters = []
+    if type_optie:
+        filters.append(("type", "==", type_optie))
+    if expiration is not None:
+        filters.append(("expiration", "==", pd.Timestamp(expiration).date()))
+    if strike is not None:
+        filters.append(("strike", "==", int(strike)))
+    return filters or None
+
+
+def iter_chunks(table_name: str, start=None, end=None, columns=None, filters=None, partitions=None):
+    """DataFrames per partitie, met dezelfde kolommen en afgeleide velden als de pagina's."""
+    view, transform = VIEWS.get(table_name, (None, None))
+    if columns is None and view is not None:
+        columns = schema.columns(view)
+    for chunk in store.iter_table(table_name, start=start, end=end, columns=columns, filters=filters, partitions=partitions):
+        yield transform(chunk) if transform else chunk
+
+
+def write_csv(chunks, fh) -> int:
+    rows = 0
+    for chunk in chunks:
+        chunk.to_csv(fh, index=False, header=rows == 0)
+        rows += len(chunk)
+    return rows
+
+
+def write_parquet(chunks, path) -> int:
+    rows = 0
+    writer = None
+    try:
+        for chunk in chunks:
+            if writer is None:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                writer = pq.ParquetWriter(path, table.schema, compression="zstd")
+            else:
+                table = pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+            # Eén row group per partitie
+            writer.write_table(table)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        pq.write_table(pa.table({}), path)
+    return rows
+
+
+def export_table(table_name: str, fmt: str, path, **selection) -> int:
+    """Schrijf een selectie (start, end, columns, filters, partitions) naar path; geeft het aantal rijen."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Onbekend exportformaat: {fmt}")
+    with instrument.span("export", f"{fmt} {table_name}") as event:
+        chunks = iter_chunks(table_name, **selection)
+        if fmt == "csv":
+            with open(path, "w", newline="") as fh:
+                rows = write_csv(chunks, fh)
+        else:
+            rows = write_parquet(chunks, path)
+        event["rows"] = rows
+        event["bytes"] = os.path.getsize(path)
+    return rows
+
+
+def _prune() -> None:
+    # Alleen exports en achtergebleven tijdelijke bestanden; lockbestanden blijven staan zodat een
+    # slot dat een andere sessie vasthoudt niet onder haar wordt weggehaald
+    cutoff = time.time() - EXPORT_TTL
+    for path in EXPORT_DIR.glob("*"):
+        if path.suffix[1:] not in (*FORMATS, "tmp"):
+            continue
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+        except FileNotFoundError:
+            pass
+
+
+def prepare(table_name: str, fmt: str, name: str | None = None, **selection) -> Path:
+    """Maak (of hergebruik) een exportbestand voor deze selectie en de huidige stand van de store."""
+    key = json.dumps(
+        {"table": table_name, "fmt": fmt, "version": store.get_version(table_name), **selection},
+        sort_keys=True, default=str,
+    )
+    digest = hashlib.sha1(key.encode()).hexdigest()[:12]
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+    path = EXPORT_DIR / f"{name or table_name}_{digest}.{fmt}"
+    if not path.exists():
+        # Twee sessies met dezelfde selectie: één schrijft, de ander wacht en hergebruikt het bestand
+        with store.file_lock(path.with_suffix(".lock")):
+            if not path.exists():
+                _prune()
+                tmp = store.temp_path(path)
+                export_table(table_name, fmt, tmp, **selection)
+                os.replace(tmp, path)
+    return path
+
+
+def download_widget(label: str, table_name: str, key: str, name: str | None = None, **selection) -> None:
+    """Streamlit-knoppen: het bestand wordt pas gemaakt als erom gevraagd wordt."""
+    import streamlit as st
+
+    col1, col2 = st.columns([1, 3])
+    fmt = col1.radio("Formaat", FORMATS, horizontal=True, key=f"{key}_fmt", label_visibility="collapsed")
+    state_key = f"{key}_path"
+    wanted = (table_name, fmt, json.dumps(selection, sort_keys=True, default=str))
+    if col2.button(f"📦 {label} voorbereiden", key=f"{key}_prepare"):
+        with st.spinner("Export wordt gemaakt..."):
+            st.session_state[state_key] = (wanted, prepare(table_name, fmt, name=name, **selection))
+    prepared = st.session_state.get(state_key)
+    # Alleen aanbieden als het bestand nog bij de huidige selectie hoort
+    if prepared and prepared[0] == wanted and prepared[1].exists():
+        path = prepared[1]
+        with open(path, "rb") as fh:
+            col2.download_button(
+                f"⬇️ Download {path.suffix[1:].upper()} ({schema.format_bytes(path.stat().st_size)})",
+                data=fh, file_name=f"{name or table_name}.{fmt}", key=f"{key}_download",
+            )
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Exporteer een tabel uit de lokale store naar CSV of Parquet.")
+    parser.add_argument("table", choices=sorted(store.TABLES))
+    parser.add_argument("-o", "--output", help="doelbestand (standaard <tabel>.<formaat>, '-' voor stdout bij csv)")
+    parser.add_argument("-f", "--format", choices=FORMATS, default="csv")
+    parser.add_argument("--start", help="vanaf (watermark-kolom, inclusief)")
+    parser.add_argument("--end", help="tot en met (watermark-kolom)")
+    parser.add_argument("--columns", help="kommagescheiden kolommen (standaard de kolommen van de pagina)")
+    parser.add_argument("--type", dest="type_optie", choices=["call", "put"], help="alleen spx_options2")
+    parser.add_argument("--expiration", help="alleen spx_options2")
+    parser.add_argument("--strike", type=int, help="alleen spx_options2")
+    parser.add_argument("--no-sync", action="store_true", help="store niet eerst bijwerken vanuit Supabase")
+    args = parser.parse_args(argv)
+
+    if not args.no_sync:
+        store.sync_table(args.table, force=True)
+    selection = {
+        "start": args.start,
+        "end": args.end,
+        "columns": [c.strip() for c in args.columns.split(",")] if args.columns else None,
+        "filters": option_filters(args.type_optie, args.expiration, args.strike),
+    }
+    output = args.output or f"{args.table}.{args.format}"
+    if output == "-":
+        if args.format != "csv":
+            parser.error("stdout wordt alleen ondersteund voor csv")
+        rows = write_csv(iter_chunks(args.table, **selection), sys.stdout)
+    else:
+        rows = export_table(args.table, args.format, output, **selection)
+    print(f"{rows} rijen geëxporteerd naar {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
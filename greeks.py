@@ -0,0 +1,160 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Black-Scholes (Merton, met dividendrendement) over hele optieketens tegelijk: prijzen, greeks en
+# een impliciete volatiliteit uit de midprijs. De solver is een gebatchte Newton-iteratie met een
+# bisectie-vangnet per rij; alle rijen lopen samen door dezelfde NumPy-bewerkingen.
+RATE = float(os.getenv("FX_RISK_FREE_RATE", "0.04"))
+DIVIDEND = float(os.getenv("FX_DIVIDEND_YIELD", "0.013"))
+# SPX-opties settelen op de slotkoers: 16:00 New York, ongeveer 20:00 UTC
+EXPIRY_HOUR_UTC = int(os.getenv("FX_EXPIRY_HOUR_UTC", "20"))
+YEAR_SECONDS = 365 * 24 * 3600
+
+VOL_MIN, VOL_MAX = 1e-4, 5.0
+TOLERANCE = 1e-8  # in prijs, relatief t.o.v. max(prijs, 1)
+MAX_ITER = 50
+
+COLUMNS = ["mid", "iv_mid", "delta", "gamma", "theta", "vega"]
+
+
+def _erfc(x):
+    # Chebyshev-benadering (Numerical Recipes erfcc), relatieve fout < 1.2e-7, ook in de staarten
+    z = np.abs(x)
+    t = 1.0 / (1.0 + 0.5 * z)
+    poly = -z * z - 1.26551223 + t * (1.00002368 + t * (0.37409196 + t * (0.09678418 + t * (
+        -0.18628806 + t * (0.27886807 + t * (-1.13520398 + t * (1.48851587 + t * (-0.82215223 + t * 0.17087277))))))))
+    ans = t * np.exp(poly)
+    return np.where(x >= 0, ans, 2.0 - ans)
+
+
+def norm_cdf(x):
+    return 0.5 * _erfc(-x / np.sqrt(2.0))
+
+
+def norm_pdf(x):
+    return np.exp(-0.5 * x * x) / np.sqrt(2.0 * np.pi)
+
+
+def _d1_d2(spot, strike, t, sigma, rate, dividend):
+    sqrt_t = np.sqrt(t)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d1 = (np.log(spot / strike) + (rate - dividend + 0.5 * sigma ** 2) * t) / (sigma * sqrt_t)
+    return d1, d1 - sigma * sqrt_t
+
+
+def price(spot, strike, t, sigma, is_put, rate=RATE, dividend=DIVIDEND):
+    """Black-Scholes-prijs per rij."""
+    d1, d2 = _d1_d2(spot, strike, t, sigma, rate, dividend)
+    fwd_spot = spot * np.exp(-dividend * t)
+    pv_strike = strike * np.exp(-rate * t)
+    call = fwd_spot * norm_cdf(d1) - pv_strike * norm_cdf(d2)
+    put = pv_strike * norm_cdf(-d2) - fwd_spot * norm_cdf(-d1)
+    return np.where(is_put, put, call)
+
+
+def greeks(spot, strike, t, sigma, is_put, rate=RATE, dividend=DIVIDEND) -> dict:
+    """Delta, gamma, theta (per kalenderdag) en vega (per volatiliteitspunt) per rij."""
+    d1, d2 = _d1_d2(spot, strike, t, sigma, rate, dividend)
+    sqrt_t = np.sqrt(t)
+    disc_q = np.exp(-dividend * t)
+    disc_r = np.exp(-rate * t)
+    pdf = norm_pdf(d1)
+    sign = np.where(is_put, -1.0, 1.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gamma = disc_q * pdf / (spot * sigma * sqrt_t)
+        decay = -spot * disc_q * pdf * sigma / (2 * sqrt_t)
+    theta = decay - sign * rate * strike * disc_r * norm_cdf(sign * d2) + sign * dividend * spot * disc_q * norm_cdf(sign * d1)
+    return {
+        "delta": sign * disc_q * norm_cdf(sign * d1),
+        "gamma": gamma,
+        "theta": theta / 365,
+        "vega": spot * disc_q * pdf * sqrt_t / 100,
+    }
+
+
+def implied_volatility(target, spot, strike, t, is_put, rate=RATE, dividend=DIVIDEND,
+                       tol: float = TOLERANCE, max_iter: int = MAX_ITER) -> np.ndarray:
+    """Impliciete volatiliteit per rij; NaN als de prijs buiten de arbitragegrenzen valt of niet convergeert."""
+    target, spot, strike, t = (np.asarray(a, dtype=np.float64) for a in (target, spot, strike, t))
+    is_put = np.asarray(is_put, dtype=bool)
+    fwd_spot = spot * np.exp(-dividend * t)
+    pv_strike = strike * np.exp(-rate * t)
+    lower = np.where(is_put, np.clip(pv_strike - fwd_spot, 0, None), np.clip(fwd_spot - pv_strike, 0, None))
+    upper = np.where(is_put, pv_strike, fwd_spot)
+    valid = np.isfinite(target) & np.isfinite(spot) & np.isfinite(strike) & (t > 0) & (target > lower) & (target < upper)
+
+    sigma = np.full(target.shape, np.nan)
+    lo = np.full(target.shape, VOL_MIN)
+    hi = np.full(target.shape, VOL_MAX)
+    # Startwaarde volgens Brenner-Subrahmanyam (at-the-money benadering)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        guess = np.sqrt(2 * np.pi / t) * target / spot
+    sigma[valid] = np.clip(guess[valid], 0.05, 2.0)
+    active = np.flatnonzero(valid)
+
+    for _ in range(max_iter):
+        if not len(active):
+            break
+        s, k, tt, p, s_ = spot[active], strike[active], t[active], is_put[active], sigma[active]
+        diff = price(s, k, tt, s_, p, rate, dividend) - target[active]
+        done = np.abs(diff) < tol * np.maximum(target[active], 1.0)
+        # De prijs stijgt monotoon met sigma: het teken van diff verkleint de bracket
+        hi[active] = np.where(diff > 0, s_, hi[active])
+        lo[active] = np.where(diff < 0, s_, lo[active])
+        vega = greeks(s, k, tt, s_, p, rate, dividend)["vega"] * 100
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            step = s_ - diff / vega
+        # Newton-stap buiten de bracket (of vlakke vega): bisectie
+        bisect = ~((step > lo[active]) & (step < hi[active]))
+        sigma[active] = np.where(done, s_, np.where(bisect, 0.5 * (lo[active] + hi[active]), step))
+        active = active[~done & (hi[active] - lo[active] > 1e-10)]
+
+    sigma[active] = np.nan
+    return sigma
+
+
+def mid_price(df: pd.DataFrame) -> np.ndarray:
+    """(bid + ask) / 2 bij een geldige quote, anders de laatste prijs."""
+    bid = df["bid"].to_numpy(dtype=np.float64, na_value=np.nan)
+    ask = df["ask"].to_numpy(dtype=np.float64, na_value=np.nan)
+    last = df["last_price"].to_numpy(dtype=np.float64, na_value=np.nan)
+    quoted = (bid > 0) & (ask >= bid)
+    return np.where(quoted, (bid + ask) / 2, np.where(last > 0, last, np.nan))
+
+
+def years_to_expiry(df: pd.DataFrame) -> np.ndarray:
+    """Looptijd in jaren van de peildatum tot de settlement op de expiratiedag."""
+    snapshot = pd.to_datetime(df["snapshot_date"], utc=True)
+    expiration = pd.to_datetime(df["expiration"])
+    if expiration.dt.tz is None:
+        expiration = expiration.dt.tz_localize("UTC")
+    settle = expiration.dt.normalize() + pd.Timedelta(hours=EXPIRY_HOUR_UTC)
+    return (settle - snapshot).dt.total_seconds().to_numpy(dtype=np.float64, na_value=np.nan) / YEAR_SECONDS
+
+
+def option_greeks(df: pd.DataFrame, rate: float = RATE, dividend: float = DIVIDEND) -> pd.DataFrame:
+    """Voeg mid, iv_mid en de greeks toe aan een (deel van een) optieketen.
+
+    De greeks gebruiken iv_mid; waar de solver geen oplossing vindt valt hij terug op implied_volatility.
+    """
+    if df.empty:
+        return df.assign(**{c: pd.Series(dtype=np.float64) for c in COLUMNS})
+    spot = df["underlying_price"].to_numpy(dtype=np.float64, na_value=np.nan)
+    strike = df["strike"].to_numpy(dtype=np.float64, na_value=np.nan)
+    is_put = (df["type"] == "put").to_numpy()
+    t = years_to_expiry(df)
+    t = np.where(t > 0, t, np.nan)
+
+    mid = mid_price(df)
+    iv = implied_volatility(mid, spot, strike, t, is_put, rate, dividend)
+    sigma = np.where(np.isnan(iv), df["implied_volatility"].to_numpy(dtype=np.float64, na_value=np.nan), iv)
+    sigma = np.where(sigma > 0, sigma, np.nan)
+
+    df = df.copy()
+    df["mid"] = mid
+    df["iv_mid"] = iv
+    for name, values in greeks(spot, strike, t, sigma, is_put, rate, dividend).items():
+        df[name] = values
+    return df
@@ -0,0 +1,172 @@
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import store
+
+EMA_PERIODS = (20, 50, 100)
+SMA_PERIOD = 20
+BB_WIDTH = 2.0
+RSI_PERIOD = 14
+
+
+def ewm_recursive(x: np.ndarray, alphas: np.ndarray, state: np.ndarray, weights: np.ndarray):
+    """y_t = a * x_t + (1 - a) * y_{t-1} voor alle kolommen van x (tijd x series) tegelijk.
+
+    Gelijk aan pandas ewm(adjust=False) (ignore_na=False): over ontbrekende waarden blijft de oude
+    y per gemiste stap met (1 - a) vervallen, zodat de eerste waarde na een gat zwaarder telt.
+    state bevat de laatste y per kolom (NaN als de serie nog niet begonnen is) en weights het
+    gewicht van die y; beide worden na afloop teruggegeven.
+    """
+    out = np.empty_like(x, dtype=np.float64)
+    y = state.astype(np.float64, copy=True)
+    w = weights.astype(np.float64, copy=True)
+    keep = 1.0 - alphas
+    for t in range(x.shape[0]):
+        row = x[t]
+        valid = ~np.isnan(row)
+        started = ~np.isnan(y)
+        w = np.where(started, w * keep, w)
+        step = np.where(started, (w * y + alphas * row) / (w + alphas), row)
+        y = np.where(valid, step, y)
+        w = np.where(valid, 1.0, w)
+        out[t] = y
+    return out, y, w
+
+
+def rolling_mean_std(x: np.ndarray, window: int):
+    """Rolling gemiddelde en standaardafwijking (ddof=1) langs de tijd-as via cumulatieve sommen."""
+    valid = ~np.isnan(x)
+    filled = np.where(valid, x, 0.0)
+    zeros = np.zeros((1, x.shape[1]))
+    c1 = np.concatenate([zeros, np.cumsum(filled, axis=0)])
+    c2 = np.concatenate([zeros, np.cumsum(filled ** 2, axis=0)])
+    cn = np.concatenate([zeros, np.cumsum(valid, axis=0)])
+    s1 = c1[window:] - c1[:-window]
+    s2 = c2[window:] - c2[:-window]
+    n = cn[window:] - cn[:-window]
+    full = n == window
+    mean = np.where(full, s1 / window, np.nan)
+    var = np.where(full, (s2 - s1 ** 2 / window) / (window - 1), np.nan)
+    head = np.full((min(window - 1, x.shape[0]), x.shape[1]), np.nan)
+    return np.concatenate([head, mean]), np.concatenate([head, np.sqrt(np.clip(var, 0, None))])
+
+
+class IndicatorEngine:
+    """EMA's en RSI voor alle series en periodes in één batch, met bewaarde recursieve state.
+
+    update() verwerkt alleen rijen na de laatst verwerkte datum; SMA en Bollinger worden
+    bij het opvragen van een venster uit de opgeslagen koersen berekend.
+    """
+
+    def __init__(self, columns, ema_periods=EMA_PERIODS, rsi_period=RSI_PERIOD):
+        self.columns = list(columns)
+        self.ema_periods = tuple(ema_periods)
+        self.rsi_period = rsi_period
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        k = len(self.columns)
+        self.dates = np.array([], dtype="datetime64[ns]")
+        self.values = np.empty((0, k))
+        self.ema = np.empty((0, len(self.ema_periods) * k))
+        self.rsi = np.empty((0, k))
+        self._ema_state = np.full(len(self.ema_periods) * k, np.nan)
+        self._ema_weights = np.ones(len(self.ema_periods) * k)
+        self._rsi_state = np.full(2 * k, np.nan)
+        self._rsi_weights = np.ones(2 * k)
+        self._last = np.full(k, np.nan)
+
+    def _ema_alphas(self) -> np.ndarray:
+        return np.repeat([2.0 / (p + 1) for p in self.ema_periods], len(self.columns))
+
+    def update(self, df: pd.DataFrame, date_column: str = "date") -> int:
+        """Verwerk nieuwe rijen uit df; herberekent alles als de historie zelf is gewijzigd."""
+        dates = df[date_column].to_numpy(dtype="datetime64[ns]")
+        with self.lock:
+            if len(self.dates):
+                known = dates[dates <= self.dates[-1]]
+                if len(known) != len(self.dates) or not np.array_equal(known, self.dates):
+                    self._reset()
+            new = dates > self.dates[-1] if len(self.dates) else np.ones(len(dates), dtype=bool)
+            if not new.any():
+                return 0
+            x = df.loc[new, self.columns].to_numpy(dtype=np.float64)
+
+            ema, self._ema_state, self._ema_weights = ewm_recursive(
+                np.tile(x, len(self.ema_periods)), self._ema_alphas(), self._ema_state, self._ema_weights)
+
+            # RSI (Wilder): gemiddelde winst/verlies met alpha = 1/n op de dagelijkse verschillen
+            prev = np.vstack([self._last, x[:-1]])
+            prev = pd.DataFrame(prev).ffill().to_numpy()
+            diff = x - prev
+            moves = np.hstack([np.clip(diff, 0, None), np.clip(-diff, 0, None)])
+            moves[np.isnan(np.hstack([diff, diff]))] = np.nan
+            avg, self._rsi_state, self._rsi_weights = ewm_recursive(
+                moves, np.full(moves.shape[1], 1.0 / self.rsi_period), self._rsi_state, self._rsi_weights)
+            k = len(self.columns)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                rsi = 100 - 100 / (1 + avg[:, :k] / avg[:, k:])
+            last_valid = pd.DataFrame(x).ffill().to_numpy()[-1]
+            self._last = np.where(np.isnan(last_valid), self._last, last_valid)
+
+            self.dates = np.concatenate([self.dates, dates[new]])
+            self.values = np.vstack([self.values, x])
+            self.ema = np.vstack([self.ema, ema])
+            self.rsi = np.vstack([self.rsi, rsi])
+            return int(new.sum())
+
+    def frame(self, start=None, end=None, sma_period=SMA_PERIOD, bb_width=BB_WIDTH) -> pd.DataFrame:
+        """Koersen en indicatoren voor [start, end] als DataFrame (kolommen 'PAAR EMA20', ...)."""
+        lo = 0 if start is None else int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start)), "left"))
+        hi = len(self.dates) if end is None else int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end)), "right"))
+        k = len(self.columns)
+        data = {"date": self.dates[lo:hi]}
+        for j, col in enumerate(self.columns):
+            data[col] = self.values[lo:hi, j]
+        for i, p in enumerate(self.ema_periods):
+            for j, col in enumerate(self.columns):
+                data[f"{col} EMA{p}"] = self.ema[lo:hi, i * k + j]
+        # SMA/Bollinger: alleen het venster plus de opwarmperiode ervoor
+        warm = max(lo - sma_period + 1, 0)
+        mean, std = rolling_mean_std(self.values[warm:hi], sma_period)
+        mean, std = mean[lo - warm:], std[lo - warm:]
+        for j, col in enumerate(self.columns):
+            data[f"{col} SMA{sma_period}"] = mean[:, j]
+            data[f"{col} BB_upper"] = mean[:, j] + bb_width * std[:, j]
+            data[f"{col} BB_lower"] = mean[:, j] - bb_width * std[:, j]
+            data[f"{col} RSI{self.rsi_period}"] = self.rsi[lo:hi, j]
+        return pd.DataFrame(data)
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Unieke tijdelijke naam en een bestandsslot: meerdere workers kunnen tegelijk opslaan
+        tmp = store.temp_path(path)
+        with store.file_lock(path.with_suffix(".lock")):
+            with self.lock, open(tmp, "wb") as f:
+                np.savez(
+                    f, columns=np.array(self.columns), ema_periods=np.array(self.ema_periods),
+                    rsi_period=self.rsi_period, dates=self.dates, values=self.values, ema=self.ema, rsi=self.rsi,
+                    ema_state=self._ema_state, ema_weights=self._ema_weights,
+                    rsi_state=self._rsi_state, rsi_weights=self._rsi_weights, last=self._last,
+                )
+            tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path, columns, ema_periods=EMA_PERIODS, rsi_period=RSI_PERIOD) -> "IndicatorEngine":
+        engine = cls(columns, ema_periods, rsi_period)
+        if not path.exists():
+            return engine
+        with np.load(path) as saved:
+            if (list(saved["columns"]) != list(columns) or tuple(saved["ema_periods"]) != tuple(ema_periods)
+                    or int(saved["rsi_period"]) != rsi_period or "ema_weights" not in saved):
+                return engine
+            engine.dates, engine.values = saved["dates"], saved["values"]
+            engine.ema, engine.rsi = saved["ema"], saved["rsi"]
+            engine._ema_state, engine._ema_weights = saved["ema_state"], saved["ema_weights"]
+            engine._rsi_state, engine._rsi_weights = saved["rsi_state"], saved["rsi_weights"]
+            engine._last = saved["last"]
+        return engine
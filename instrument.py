@@ -0,0 +1,145 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Lichte instrumentatie van de hot paths: elke Supabase-query, store-actie, cache-aanroep en
+# grafiekopbouw wordt als event vastgelegd (duur, rijen, bytes, cache hit/miss, paginanummer).
+# Events staan in een begrensde ringbuffer per proces; met FX_TRACE_FILE worden ze ook als
+# JSON-regels weggeschreven.
+MAX_EVENTS = int(os.getenv("FX_TRACE_EVENTS", "20000"))
+TRACE_FILE = os.getenv("FX_TRACE_FILE")
+
+_events = deque(maxlen=MAX_EVENTS)
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def session_id():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx(suppress_warning=True)
+    except Exception:
+        return None
+    return ctx.session_id if ctx else None
+
+
+def set_page(name: str) -> None:
+    """Koppel de events van deze scriptrun aan een dashboardpagina."""
+    _local.page = name
+
+
+def _stack() -> list:
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def current() -> dict | None:
+    """Het binnenste open event in deze thread (bv. om bytes bij een query op te tellen)."""
+    stack = _stack()
+    return stack[-1] if stack else None
+
+
+def record(event: dict) -> None:
+    event.setdefault("ts", time.time())
+    event.setdefault("page", getattr(_local, "page", None) or "achtergrond")
+    event.setdefault("session", session_id())
+    event.setdefault("thread", threading.current_thread().name)
+    with _lock:
+        _events.append(event)
+        if TRACE_FILE:
+            with open(TRACE_FILE, "a") as fh:
+                fh.write(json.dumps(event, default=str) + "\n")
+
+
+@contextmanager
+def span(kind: str, name: str, **attrs):
+    """Meet een blok code; het event kan binnen het blok worden aangevuld (rows, bytes, cache)."""
+    event = {"kind": kind, "name": name, "ts": time.time(), **attrs}
+    parent = current()
+    if parent is not None:
+        event["parent"] = parent["name"]
+    stack = _stack()
+    stack.append(event)
+    started = time.perf_counter()
+    try:
+        yield event
+    except Exception as exc:
+        event["error"] = type(exc).__name__
+        raise
+    finally:
+        event["ms"] = round((time.perf_counter() - started) * 1000, 3)
+        stack.pop()
+        record(event)
+
+
+def timed(kind: str, name: str | None = None):
+    """Decorator-variant van span; rijen worden uit een DataFrame-resultaat afgeleid."""
+    def decorator(fn):
+        label = name or fn.__name__
+
+        def wrapper(*args, **kwargs):
+            with span(kind, label) as event:
+                result = fn(*args, **kwargs)
+                if isinstance(result, pd.DataFrame):
+                    event["rows"] = len(result)
+                return result
+
+        wrapper.__name__ = fn.__name__
+        wrapper.__doc__ = fn.__doc__
+        wrapper.__wrapped__ = fn
+        return wrapper
+    return decorator
+
+
+def events() -> pd.DataFrame:
+    with _lock:
+        rows = list(_events)
+    df = pd.DataFrame(rows)
+    if not df.empty:
+        df["start"] = pd.to_datetime(df["ts"], unit="s")
+        df["end"] = df["start"] + pd.to_timedelta(df["ms"].fillna(0), unit="ms")
+    return df
+
+
+def clear() -> None:
+    with _lock:
+        _events.clear()
+
+
+def summary(df: pd.DataFrame, by=("kind", "name")) -> pd.DataFrame:
+    """Aantal, percentielen van de duur en totalen per groep."""
+    if df.empty:
+        return df
+    by = list(by)
+    for column in ["rows", "bytes", "cache"]:
+        if column not in df:
+            df = df.assign(**{column: None})
+    grouped = df.groupby(by, dropna=False)
+    out = grouped["ms"].describe(percentiles=[0.5, 0.9, 0.99])[["count", "50%", "90%", "99%", "max"]]
+    out.columns = ["aantal", "p50 ms", "p90 ms", "p99 ms", "max ms"]
+    out["totaal ms"] = grouped["ms"].sum()
+    out["rijen"] = grouped["rows"].sum(min_count=1)
+    out["bytes"] = grouped["bytes"].sum(min_count=1)
+    out["hit ratio"] = grouped["cache"].apply(lambda c: c.isin(["hit", "stale"]).sum() / c.notna().sum() if c.notna().any() else None)
+    return out.reset_index().sort_values("totaal ms", ascending=False)
+
+
+def to_jsonl(df: pd.DataFrame | None = None) -> str:
+    df = events() if df is None else df
+    if df.empty:
+        return ""
+    return df.drop(columns=["start", "end"], errors="ignore").to_json(orient="records", lines=True)
+
+
+def export(path: str | None = None) -> str:
+    """Schrijf de huidige buffer als JSON-lines trace naar een lokaal bestand."""
+    path = path or TRACE_FILE or "fx_trace.jsonl"
+    with open(path, "w") as fh:
+        fh.write(to_jsonl())
+    return path
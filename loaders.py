@@ -0,0 +1,61 @@
+import pandas as pd
+
+import schema
+import shared
+import store
+from cache import ensure_synced, ranges, swr
+
+# Gedeelde loaders voor de pagina's en de warm-up; resultaten via de stale-while-revalidate cache.
+
+# paarnaam -> (kolom, omkeren)
+FX_PAIRS = {
+    "EUR/USD": ("eur_usd", True),
+    "USD/JPY": ("usd_jpy", False),
+    "GBP/USD": ("gbp_usd", True),
+    "AUD/USD": ("aud_usd", True),
+    "USD/CHF": ("usd_chf", False),
+}
+
+
+def add_fx_pairs(df: pd.DataFrame) -> pd.DataFrame:
+    """Voeg de koersen als valutapaar toe (EUR/USD e.d. zijn omgekeerd opgeslagen)."""
+    df = df.dropna(subset=["date"]).sort_values("date")
+    for pair, (column, invert) in FX_PAIRS.items():
+        values = df.get(column, pd.NA)
+        df[pair] = 1 / values if invert else values
+    return df
+
+
+# Vensters worden uit een eerder geladen (groter) bereik gesneden; meestal de volledige historie
+@ranges("date", ttl=3600)
+def load_fx(start_date=None, end_date=None) -> pd.DataFrame:
+    ensure_synced("fx_rates")
+    if start_date is None and end_date is None:
+        # Volledige historie: één kopie voor alle workers
+        return shared.get_frame("fx", store.get_version("fx_rates"), _load_fx)
+    return _load_fx(start_date, end_date)
+
+
+def _load_fx(start_date=None, end_date=None) -> pd.DataFrame:
+    df = store.load_table("fx_rates", start=start_date, end=end_date, columns=schema.columns("fx"))
+    if df.empty:
+        return df
+    return add_fx_pairs(df)
+
+
+def fx_default_window():
+    """Standaardvenster van pagina 1: de laatste 3 maanden tot de meest recente koers."""
+    full = load_fx()
+    if full.empty:
+        return None, None
+    end = full["date"].max()
+    return end - pd.DateOffset(months=3), end
+
+
+@swr(ttl=3600)
+def load_sp500() -> pd.DataFrame:
+    ensure_synced("sp500_delta_view")
+    return shared.get_frame(
+        "sp500", store.get_version("sp500_delta_view"),
+        lambda: store.load_table("sp500_delta_view", columns=schema.columns("sp500")),
+    )
@@ -1,28 +1,31 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-from supabase import create_client
+import store
+import schema
+import loaders
+import warmup
+import indicators
+import downsample
+import instrument
+import export
+import rollups
+import cache
 
-# === Supabase verbinden via secrets ===
-def get_supabase_client():
-    url = st.secrets["SUPABASE_URL"]
-    key = st.secrets["SUPABASE_KEY"]
-    return create_client(url, key)
-
-supabase = get_supabase_client()
+instrument.set_page("FX Rates")
 
 # === Titel
 st.markdown('<h1 style="text-align:center; color:#1E90FF;">💱 FX Dashboard met EMA</h1>', unsafe_allow_html=True)
 
-# === Datumfilter ophalen
-min_resp = supabase.table("fx_rates").select("date").order("date").limit(1).execute()
-max_resp = supabase.table("fx_rates").select("date").order("date", desc=True).limit(1).execute()
-if not min_resp.data or not max_resp.data:
+# === Volledige historie uit de cache (stale-while-revalidate) en datumfilter bepalen
+warmup.start()
+full = loaders.load_fx()
+if full.empty:
     st.error("Geen data beschikbaar.")
     st.stop()
 
-min_date = pd.to_datetime(min_resp.data[0]["date"]).date()
-max_date = pd.to_datetime(max_resp.data[0]["date"]).date()
+min_date = full["date"].min().date()
+max_date = full["date"].max().date()
 st.sidebar.write(f"📆 Beschikbaar: {min_date} → {max_date}")
 
 # === Datumselectie
@@ -35,79 +38,98 @@ if start > end:
     st.sidebar.error("Startdatum moet voor Einddatum zijn.")
     st.stop()
 
-# === Data ophalen
-@st.cache_data(ttl=3600)
-def load_data(start_date, end_date):
-    all_data = []
-    offset = 0
-    limit = 1000
-    while True:
-        resp = (
-            supabase.table("fx_rates")
-            .select("*")
-            .gte("date", start_date.strftime('%Y-%m-%d'))
-            .lte("date", end_date.strftime('%Y-%m-%d'))
-            .order("date")
-            .range(offset, offset + limit - 1)
-            .execute()
-        )
-        chunk = resp.data or []
-        if not chunk:
-            break
-        all_data.extend(chunk)
-        offset += limit
-    df = pd.DataFrame(all_data)
-    if df.empty:
-        return df
-    df["date"] = pd.to_datetime(df["date"])
-    df = df.dropna(subset=["date"]).sort_values("date")
-    df["EUR/USD"] = 1 / df.get("eur_usd", pd.NA)
-    df["USD/JPY"] = df.get("usd_jpy", pd.NA)
-    df["GBP/USD"] = 1 / df.get("gbp_usd", pd.NA)
-    df["AUD/USD"] = 1 / df.get("aud_usd", pd.NA)
-    df["USD/CHF"] = df.get("usd_chf", pd.NA)
-    return df
-
-df = load_data(start, end)
+# === Indicatoren over de volledige historie; alleen nieuwe dagen worden doorgerekend
+PAIRS = list(loaders.FX_PAIRS)
+INDICATOR_PATH = store.STORE_DIR / "fx_rates" / "_indicators.npz"
+
+@st.cache_resource
+def get_indicator_engine():
+    return indicators.IndicatorEngine.load(INDICATOR_PATH, PAIRS)
+
+engine = get_indicator_engine()
+with instrument.span("compute", "indicatoren bijwerken", rows=len(full)):
+    if engine.update(full):
+        engine.save(INDICATOR_PATH)
+
+# === Resolutie: lange vensters uit de week- of maandrollups (slotkoers plus OHLC per periode)
+resolution = rollups.resolution_selector(start, end, key="fx_resolution")
+df = loaders.load_fx(start, end) if resolution == "dag" else rollups.load("fx_rates", resolution, start, end)
 if df.empty:
     st.warning("Geen FX-data gevonden voor deze periode.")
     st.stop()
+st.sidebar.caption(f"🧮 Data in geheugen: {schema.describe_footprint(df)}")
 
 # === EMA instellingen
 st.sidebar.header("📐 EMA-instellingen")
-ema_periods = st.sidebar.multiselect("Kies EMA-periodes", [20, 50, 100], default=[20])
+ema_periods = st.sidebar.multiselect("Kies EMA-periodes", list(indicators.EMA_PERIODS), default=[20])
+show_bb = st.sidebar.checkbox(f"Bollinger-banden ({indicators.SMA_PERIOD}, {indicators.BB_WIDTH:.0f}σ)", value=False)
 
-# === Overlay
-st.subheader("📈 Overlay van valutaparen (max 2)")
-avail = ["EUR/USD", "USD/JPY", "GBP/USD", "AUD/USD", "USD/CHF"]
-selected = st.multiselect("Selecteer valutaparen", avail, default=["EUR/USD", "USD/JPY"])
-if selected:
+# === Figuren worden per (selectie, periode, resolutie, instellingen, dataversie) hergebruikt
+data_version = (store.get_version("fx_rates"), len(full))
+period_key = (start, end, resolution)
+
+def overlay_figure(pairs):
+    o = downsample.lttb_frame(df, "date", pairs)
     fig = go.Figure()
-    fig.add_trace(go.Scatter(x=df["date"], y=df[selected[0]], name=selected[0], yaxis="y1"))
-    if len(selected) > 1:
-        fig.add_trace(go.Scatter(x=df["date"], y=df[selected[1]], name=selected[1], yaxis="y2"))
+    fig.add_trace(go.Scatter(x=o["date"], y=o[pairs[0]], name=pairs[0], yaxis="y1"))
+    if len(pairs) > 1:
+        fig.add_trace(go.Scatter(x=o["date"], y=o[pairs[1]], name=pairs[1], yaxis="y2"))
     fig.update_layout(
         xaxis=dict(title="Datum"),
-        yaxis=dict(title=selected[0], side="left"),
-        yaxis2=dict(title=selected[1], overlaying="y", side="right") if len(selected) > 1 else {},
+        yaxis=dict(title=pairs[0], side="left"),
+        yaxis2=dict(title=pairs[1], overlaying="y", side="right") if len(pairs) > 1 else {},
         legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
     )
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
+
+_indicator_frames = {}
+
+def indicator_frame():
+    # Pas berekend als er een paargrafiek opgebouwd moet worden
+    if "d" not in _indicator_frames:
+        d_all = engine.frame(start, end)
+        if resolution != "dag":
+            # Indicatoren blijven dagindicatoren, genomen op de laatste handelsdag van elke periode
+            d_all = rollups.sample_at(d_all, df)
+        _indicator_frames["d"] = d_all
+    return _indicator_frames["d"]
+
+def pair_figure(pair):
+    d = downsample.lttb_frame(indicator_frame(), "date", [pair] + [f"{pair} EMA{p}" for p in ema_periods])
+    fig = go.Figure()
+    if resolution == "dag":
+        fig.add_trace(go.Scatter(x=d["date"], y=d[pair], name=pair, line=dict(color="blue")))
+    else:
+        fig.add_trace(go.Candlestick(
+            x=d["date"], open=d[f"{pair} open"], high=d[f"{pair} high"], low=d[f"{pair} low"], close=d[pair], name=pair
+        ))
+    for p in ema_periods:
+        fig.add_trace(go.Scatter(x=d["date"], y=d[f"{pair} EMA{p}"], name=f"EMA{p}", line=dict(dash="dash")))
+    if show_bb:
+        for band in ["BB_upper", "BB_lower"]:
+            fig.add_trace(go.Scatter(x=d["date"], y=d[f"{pair} {band}"], name=band, line=dict(color="gray", width=1)))
+    fig.update_layout(xaxis_title="Datum", yaxis_title="Koers", xaxis_rangeslider_visible=False)
+    return fig
+
+# === Overlay
+st.subheader("📈 Overlay van valutaparen (max 2)")
+avail = PAIRS
+selected = st.multiselect("Selecteer valutaparen", avail, default=["EUR/USD", "USD/JPY"])
+if selected:
+    pairs = tuple(selected[:2])
+    with instrument.span("render", "overlay"):
+        cache.plotly_chart(("overlay", pairs, period_key, data_version), lambda: overlay_figure(pairs), "figuur overlay")
 
 # === Grafieken per paar met EMA
+# Alleen de gekozen paren worden opgebouwd (st.tabs en st.expander voeren hun inhoud altijd uit)
 st.subheader("📊 Koersontwikkeling per valutapaar met EMA")
-for pair in avail:
+shown = st.radio("Valutapaar", avail + ["Alle"], horizontal=True, label_visibility="collapsed")
+for pair in avail if shown == "Alle" else [shown]:
     st.markdown(f"### {pair}")
-    d = df[["date", pair]].copy()
-    for p in ema_periods:
-        d[f"EMA{p}"] = d[pair].ewm(span=p, adjust=False).mean()
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(x=d["date"], y=d[pair], name=pair, line=dict(color="blue")))
-    for p in ema_periods:
-        fig.add_trace(go.Scatter(x=d["date"], y=d[f"EMA{p}"], name=f"EMA{p}", line=dict(dash="dash")))
-    fig.update_layout(xaxis_title="Datum", yaxis_title="Koers")
-    st.plotly_chart(fig, use_container_width=True)
-    st.metric(f"Laatste koers {pair}", f"{d[pair].iloc[-1]:.4f}")
+    with instrument.span("render", f"grafiek {pair}", resolution=resolution):
+        key = ("pair", pair, period_key, tuple(sorted(ema_periods)), show_bb, data_version)
+        cache.plotly_chart(key, lambda: pair_figure(pair), f"figuur {pair}")
+    st.metric(f"Laatste koers {pair}", f"{df[pair].iloc[-1]:.4f}")
 
-# === Download
-st.download_button("⬇️ Download CSV", data=df.to_csv(index=False), file_name="fx_data.csv")
+# === Download (bestand wordt pas gemaakt na een klik, per jaarpartitie uit de store geschreven)
+export.download_widget("Export", "fx_rates", key="fx_export", name="fx_data", start=str(start.date()), end=str(end.date()))
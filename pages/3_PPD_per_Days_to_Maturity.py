@@ -1,77 +1,60 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
-from supabase import create_client, Client
-import os
+import connection
+import catalog
+import chain
+import warmup
+import schema
+import instrument
+import export
+import store
+import greeks
 
 # Set page config
 st.set_page_config(page_title="SPX Opties - PPD per Days to Maturity", layout="wide")
 
-# Initialize Supabase client
-SUPABASE_URL = os.environ.get("SUPABASE_URL")
-SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
-if not SUPABASE_URL or not SUPABASE_KEY:
+# Check Supabase configuration (used by the local store sync)
+if not connection.is_configured():
     st.error("Supabase configuratie ontbreekt. Controleer SUPABASE_URL en SUPABASE_KEY.")
     st.stop()
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-# Fetch unique values for filters with error handling
-@st.cache_data(ttl=3600)
-def get_unique_values(table_name, column):
-    response = supabase.table(table_name).select("{}".format(column)).execute()
-    if response.data:
-        values = [row[column] for row in response.data if row[column] is not None]
-        try:
-            if column == "expiration" or column == "snapshot_date":
-                return sorted(set(values), key=lambda x: pd.to_datetime(x))
-            elif column == "strike":
-                all_strike_data = supabase.table(table_name).select("strike").execute()
-                df = pd.DataFrame(all_strike_data.data)
-                return sorted(df["strike"].dropna().unique().astype(int).tolist())
-            else:
-                return sorted(set(values), key=lambda x: float(x) if isinstance(x, (int, float, str)) and str(x).replace('.', '').replace('-', '').isdigit() else 0)
-        except Exception as e:
-            st.write(f"Debug - Error processing {column} values: {e}")
-            return values
-    return []
-
-# Fetch data in chunks with filters
-@st.cache_data(ttl=3600)
-def fetch_filtered_data(table_name, type_optie=None, snapshot_dates=None, strike=None, batch_size=1000):
-    offset = 0
-    all_data = []
-    query = supabase.table(table_name).select("*")
-    if type_optie:
-        query = query.eq("type", type_optie)
-    if snapshot_dates and len(snapshot_dates) > 0:
-        query = query.in_("snapshot_date", [str(s) for s in snapshot_dates])
-    if strike is not None:
-        query = query.eq("strike", int(strike))
-    while True:
-        response = query.range(offset, offset + batch_size - 1).execute()
-        if not response.data:
-            break
-        all_data.extend(response.data)
-        offset += batch_size
-    if all_data:
-        df = pd.DataFrame(all_data)
-        df["snapshot_date"] = pd.to_datetime(df["snapshot_date"], utc=True, errors="coerce")
-        df["expiration"] = pd.to_datetime(df["expiration"], utc=True, errors="coerce")
-        return df.sort_values("snapshot_date")
-    return pd.DataFrame()
+instrument.set_page("PPD per Days to Maturity")
+warmup.start()
+
+# Slice from the shared in-memory option chain (no network round trip per filter change)
+@instrument.timed("fetch")
+def fetch_filtered_data(table_name, type_optie, snapshot_dates=None, strike=None):
+    option_chain = chain.get_chain(table_name)
+    if strike is None or not len(option_chain):
+        return pd.DataFrame()
+    df = option_chain.strike_history(type_optie, strike, snapshot_dates or None)
+    if df.empty:
+        return df
+    df["expiration"] = pd.to_datetime(df["expiration"], utc=True, errors="coerce")
+    return df.sort_values("snapshot_date")
+
+# Volledige keten van één peildatum met IV uit de midprijs en greeks (gevectoriseerd over alle contracten)
+@instrument.timed("fetch")
+def fetch_chain_greeks(table_name, type_optie, snapshot_date):
+    option_chain = chain.get_chain(table_name)
+    if snapshot_date is None or not len(option_chain):
+        return pd.DataFrame()
+    df = option_chain.snapshot(snapshot_date, type_optie)
+    with instrument.span("compute", "greeks", rows=len(df)):
+        return greeks.option_greeks(df)
 
 # Sidebar filters
 st.sidebar.header("🔍 Filters voor PPD per Days to Maturity")
 type_optie = st.sidebar.selectbox("Type optie (Put/Call)", ["call", "put"], index=1)
-snapshot_dates = get_unique_values("spx_options2", "snapshot_date")
+snapshot_dates = catalog.snapshot_dates("spx_options2")
 if snapshot_dates:
     snapshot_dates_sorted = sorted(snapshot_dates, key=lambda x: pd.to_datetime(x), reverse=True)
     default_snapshots = [snapshot_dates_sorted[0]]
     selected_snapshot_dates = st.sidebar.multiselect("Selecteer Peildatum(s)", snapshot_dates_sorted, default=default_snapshots, format_func=lambda x: pd.to_datetime(x).strftime('%Y-%m-%d %H:%M'))
 else:
     selected_snapshot_dates = []
-strikes = get_unique_values("spx_options2", "strike")
+strikes = sorted({int(s) for s in catalog.strikes("spx_options2", type_optie)})
 if strikes:
     strike = st.sidebar.selectbox("Strike (alleen actief)", strikes, index=strikes.index(5500) if 5500 in strikes else 0, format_func=lambda x: f"{x:.0f}")
     st.sidebar.write(f"Debug - Selected strike: {strike}")
@@ -84,10 +67,9 @@ df_all_data = fetch_filtered_data("spx_options2", type_optie, selected_snapshot_
 
 st.header("PPD per Days to Maturity")
 if not df_all_data.empty:
-    df = df_all_data.copy()
-    df["days_to_maturity"] = (df["expiration"] - df["snapshot_date"]).dt.days
-    df = df[df["days_to_maturity"] > 0]
-    df["ppd"] = df["bid"] / df["days_to_maturity"].replace(0, 0.01)
+    st.sidebar.caption(f"🧮 Data in geheugen: {schema.describe_footprint(df_all_data)}")
+    # days_to_maturity en ppd zijn bij de sync al per snapshot berekend (derived.py)
+    df = df_all_data[df_all_data["days_to_maturity"].fillna(0).gt(0)].copy()
 
     df = df[df["snapshot_date"].isin(selected_snapshot_dates)]
 
@@ -96,36 +78,89 @@ if not df_all_data.empty:
 
     df["snapshot_label"] = df["snapshot_date"].dt.strftime('%Y-%m-%d %H:%M')
 
-    chart_line = alt.Chart(df).mark_line(point=True).encode(
-        x=alt.X("days_to_maturity:Q", title="Dagen tot Maturity", sort="ascending"),
-        y=alt.Y("ppd:Q", title="Premium per Dag (PPD)", scale=alt.Scale(zero=True, nice=True)),
-        color=alt.Color("snapshot_label:N", title="Peildatum", scale=color_scale),
-        tooltip=["snapshot_label:N", "days_to_maturity", "ppd"]
-    ).interactive().properties(
-        title=f"PPD per Dag tot Maturity (Overzicht) — {type_optie.upper()} | Strike {strike:.0f}",
-        height=500
-    )
-    st.altair_chart(chart_line, use_container_width=True)
+    with instrument.span("render", "ppd overzicht", rows=len(df)):
+        chart_line = alt.Chart(df).mark_line(point=True).encode(
+            x=alt.X("days_to_maturity:Q", title="Dagen tot Maturity", sort="ascending"),
+            y=alt.Y("ppd:Q", title="Premium per Dag (PPD)", scale=alt.Scale(zero=True, nice=True)),
+            color=alt.Color("snapshot_label:N", title="Peildatum", scale=color_scale),
+            tooltip=["snapshot_label:N", "days_to_maturity", "ppd"]
+        ).interactive().properties(
+            title=f"PPD per Dag tot Maturity (Overzicht) — {type_optie.upper()} | Strike {strike:.0f}",
+            height=500
+        )
+        st.altair_chart(chart_line, use_container_width=True)
 
     max_days = st.sidebar.slider("Max Days to Maturity (Tweede Grafiek)", 1, int(df["days_to_maturity"].max()), 21)
     df_short = df[df["days_to_maturity"] <= max_days].copy()
     df_short = df_short.sort_values(by=["days_to_maturity", "snapshot_date"])
 
     if not df_short.empty:
-        line_chart = alt.Chart(df_short).mark_line(point=True).encode(
-            x=alt.X("days_to_maturity:O", title=f"Dagen tot Maturity (0-{max_days})", sort=list(map(str, sorted(df_short["days_to_maturity"].unique())))),
-            y=alt.Y("ppd:Q", title="Premium per Dag (PPD)", scale=alt.Scale(zero=True)),
-            color=alt.Color("snapshot_label:N", title="Peildatum", scale=color_scale),
-            tooltip=["snapshot_label:N", "days_to_maturity", "ppd"]
-        ).properties(
-            title=f"PPD per Dag tot Maturity (0-{max_days} dagen)",
-            height=400
-        )
-        st.altair_chart(line_chart, use_container_width=True)
+        with instrument.span("render", "ppd korte looptijd", rows=len(df_short)):
+            line_chart = alt.Chart(df_short).mark_line(point=True).encode(
+                x=alt.X("days_to_maturity:O", title=f"Dagen tot Maturity (0-{max_days})", sort=list(map(str, sorted(df_short["days_to_maturity"].unique())))),
+                y=alt.Y("ppd:Q", title="Premium per Dag (PPD)", scale=alt.Scale(zero=True)),
+                color=alt.Color("snapshot_label:N", title="Peildatum", scale=color_scale),
+                tooltip=["snapshot_label:N", "days_to_maturity", "ppd"]
+            ).properties(
+                title=f"PPD per Dag tot Maturity (0-{max_days} dagen)",
+                height=400
+            )
+            st.altair_chart(line_chart, use_container_width=True)
     else:
         st.write(f"Geen data beschikbaar voor dagen tot maturity ≤ {max_days}.")
 
     st.write("Aantal rijen na filtering:", len(df))
     st.write("Aantal rijen met ongeldige PPD (NaN):", df["ppd"].isna().sum())
+
+    # === Greeks en IV-smile van de volledige keten op één peildatum
+    st.header("Greeks en IV-smile")
+    smile_snapshot = st.selectbox(
+        "Peildatum voor de keten", sorted(selected_snapshot_dates, key=pd.to_datetime, reverse=True),
+        format_func=lambda x: pd.to_datetime(x).strftime('%Y-%m-%d %H:%M'),
+    )
+    df_chain = fetch_chain_greeks("spx_options2", type_optie, smile_snapshot)
+    df_chain = df_chain[df_chain["days_to_maturity"].fillna(0).gt(0)] if not df_chain.empty else df_chain
+    if not df_chain.empty:
+        expirations = [pd.Timestamp(e) for e in sorted(df_chain["expiration"].unique())]
+        selected_expirations = st.multiselect(
+            "Expiraties", expirations, default=expirations[:4], format_func=lambda x: x.strftime('%Y-%m-%d'),
+        )
+        df_smile = df_chain[df_chain["expiration"].isin(selected_expirations)].copy()
+        df_smile["expiratie"] = df_smile["expiration"].dt.strftime('%Y-%m-%d')
+        spot = float(df_chain["underlying_price"].median())
+        markers = alt.Chart(pd.DataFrame({"x": [strike, spot], "label": [f"Strike {strike:.0f}", f"S&P {spot:.0f}"]})).mark_rule(strokeDash=[4, 4], color="gray").encode(
+            x="x:Q", tooltip=["label:N"]
+        )
+
+        with instrument.span("render", "iv smile", rows=len(df_smile)):
+            smile = alt.Chart(df_smile).mark_line(point=True).encode(
+                x=alt.X("strike:Q", title="Strike", scale=alt.Scale(zero=False)),
+                y=alt.Y("iv_mid:Q", title="IV (midprijs)", axis=alt.Axis(format="%")),
+                color=alt.Color("expiratie:N", title="Expiratie"),
+                tooltip=["expiratie:N", "strike:Q", alt.Tooltip("iv_mid:Q", format=".2%"), alt.Tooltip("implied_volatility:Q", format=".2%", title="IV (bron)"), "mid:Q"]
+            ).properties(title=f"IV-smile — {type_optie.upper()} | {pd.to_datetime(smile_snapshot):%Y-%m-%d %H:%M}", height=400)
+            st.altair_chart(alt.layer(smile, markers).interactive(), use_container_width=True)
+
+        greek = st.radio("Greek", ["delta", "gamma", "theta", "vega"], horizontal=True, key="ppd_greek")
+        with instrument.span("render", f"greek {greek}", rows=len(df_smile)):
+            greek_chart = alt.Chart(df_smile).mark_line().encode(
+                x=alt.X("strike:Q", title="Strike", scale=alt.Scale(zero=False)),
+                y=alt.Y(f"{greek}:Q", title=greek.capitalize()),
+                color=alt.Color("expiratie:N", title="Expiratie"),
+                tooltip=["expiratie:N", "strike:Q", alt.Tooltip(f"{greek}:Q", format=".4f"), alt.Tooltip("iv_mid:Q", format=".2%")]
+            ).properties(title=f"{greek.capitalize()} per strike (theta per dag, vega per volatiliteitspunt)", height=350)
+            st.altair_chart(alt.layer(greek_chart, markers).interactive(), use_container_width=True)
+        st.caption(f"IV opgelost uit de midprijs voor {df_chain['iv_mid'].notna().mean():.0%} van de {len(df_chain):,} contracten; "
+                   f"rente {greeks.RATE:.2%}, dividendrendement {greeks.DIVIDEND:.2%}.")
+    else:
+        st.info("Geen keten beschikbaar voor deze peildatum.")
+
+    # Export van deze strike op de gekozen peildata, alleen de bijbehorende dagpartities worden gelezen
+    st.markdown("#### ⬇️ Export")
+    export.download_widget(
+        "Export", "spx_options2", key="ppd_export", name=f"spx_{type_optie}_{strike:.0f}",
+        filters=export.option_filters(type_optie, strike=strike),
+        partitions=sorted({store.partition_key("spx_options2", d) for d in selected_snapshot_dates}),
+    )
 else:
     st.warning("Geen data gevonden voor de geselecteerde filters.")
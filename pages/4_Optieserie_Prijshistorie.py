@@ -1,158 +1,202 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
-from supabase import create_client, Client
-import os
+import connection
 from datetime import datetime, timedelta
+import catalog
+import chain
+import warmup
+import schema
+import downsample
+import instrument
+import export
+import greeks
 
 # Set page config
 st.set_page_config(page_title="Prijsontwikkeling van een Optieserie", layout="wide")
 
-# Initialize Supabase client
-SUPABASE_URL = os.environ.get("SUPABASE_URL")
-SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
-if not SUPABASE_URL or not SUPABASE_KEY:
+# Gedeelde Supabase-client (connection pool, retries, circuit breaker)
+if not connection.is_configured():
     st.error("Supabase configuratie ontbreekt. Controleer SUPABASE_URL en SUPABASE_KEY.")
     st.stop()
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-@st.cache_data(ttl=3600)
-def get_unique_values_chunked(table_name, column, batch_size=1000):
-    offset = 0
-    all_values = set()
-    while True:
-        try:
-            query = supabase.table(table_name).select(column).range(offset, offset + batch_size - 1)
-            response = query.execute()
-            if not response.data:
-                break
-            for row in response.data:
-                if column in row:
-                    all_values.add(row[column])
-            offset += batch_size
-        except Exception as e:
-            st.warning(f"Fout bij ophalen van waarden voor {column}: {e}")
-            break
-    return sorted(all_values)
-
-@st.cache_data(ttl=3600)
-def fetch_filtered_option_data(table_name, type_optie=None, expiration=None, strike=None):
-    query = supabase.table(table_name).select("snapshot_date, bid, ask, last_price, implied_volatility, underlying_price, vix, type, expiration, strike, ppd")
-    if type_optie:
-        query = query.eq("type", type_optie)
-    if expiration:
-        query = query.eq("expiration", expiration)
-    if strike:
-        query = query.eq("strike", strike)
-
-    try:
-        response = query.execute()
-        df = pd.DataFrame(response.data)
-        if not df.empty and "snapshot_date" in df.columns:
-            df["snapshot_date"] = pd.to_datetime(df["snapshot_date"], utc=True, errors="coerce")
-            df = df.sort_values("snapshot_date")
-        return df
-    except Exception as e:
-        st.error(f"Fout bij ophalen van data: {e}")
+instrument.set_page("Optieserie Prijshistorie")
+warmup.start()
+
+# Optieserie als slice uit de gedeelde in-memory keten (geen query per filterwijziging).
+# De peildatum-range gaat als grenzen mee naar de keten: alleen rijen binnen de range worden gekopieerd.
+@instrument.timed("fetch")
+def fetch_filtered_option_data(table_name, type_optie=None, expiration=None, strike=None, start_date=None, end_date=None):
+    if type_optie is None or expiration is None or strike is None:
         return pd.DataFrame()
+    start = pd.Timestamp(start_date, tz="UTC") if start_date is not None else None
+    end = pd.Timestamp(end_date, tz="UTC") + pd.Timedelta(days=1) - pd.Timedelta(1, "ns") if end_date is not None else None
+    return chain.get_chain(table_name).series(type_optie, expiration, strike, start, end)
+
+# Vergelijking: alle gekozen series als één batch-slice uit de keten (één kopie, geen query per serie)
+MAX_COMPARE_SERIES = 24
+
+@instrument.timed("fetch")
+def fetch_option_series_batch(table_name, series, start_date=None, end_date=None):
+    start = pd.Timestamp(start_date, tz="UTC") if start_date is not None else None
+    end = pd.Timestamp(end_date, tz="UTC") + pd.Timedelta(days=1) - pd.Timedelta(1, "ns") if end_date is not None else None
+    return chain.get_chain(table_name).series_many(series, start, end)
 
 st.title(":chart_with_upwards_trend: Prijsontwikkeling van een Optieserie")
 
 st.sidebar.header(":mag: Filters")
-defaultexp = (datetime.now() + timedelta(days=7)).strftime("%Y-%m-%d")
-
-expirations = get_unique_values_chunked("spx_options2", "expiration")
-strikes = get_unique_values_chunked("spx_options2", "strike")
+defaultexp = pd.Timestamp((datetime.now() + timedelta(days=7)).date())
 
 type_optie = st.sidebar.selectbox("Type optie", ["call", "put"], index=1)
-expiration = st.sidebar.selectbox("Expiratiedatum", expirations, index=0 if defaultexp not in expirations else expirations.index(defaultexp)) if expirations else None
+
+# Keuzelijsten uit de catalogus; alleen strikes die bij de gekozen expiratie bestaan
+expirations = catalog.expirations("spx_options2", type_optie)
+expiration = st.sidebar.selectbox("Expiratiedatum", expirations, index=0 if defaultexp not in expirations else expirations.index(defaultexp), format_func=lambda x: x.strftime("%Y-%m-%d")) if expirations else None
+strikes = catalog.strikes("spx_options2", type_optie, expiration)
 strike = st.sidebar.selectbox("Strike (bijv. 5700)", strikes, index=0 if 5700 not in strikes else strikes.index(5700)) if strikes else None
 
-df = fetch_filtered_option_data("spx_options2", type_optie, expiration, strike)
+# Grenzen van de slider uit de catalogus, zodat de volledige serie niet eerst geladen hoeft te worden
+bounds = catalog.series_bounds("spx_options2", type_optie, expiration, strike) if strike is not None else None
+if bounds is None:
+    st.error("Geen data gevonden voor de opgegeven filters.")
+    st.stop()
+
+min_date = bounds[0].date()
+max_date = bounds[1].date()
+if min_date < max_date:
+    date_range = st.slider("Selecteer peildatum range", min_value=min_date, max_value=max_date, value=(min_date, max_date), format="%Y-%m-%d")
+else:
+    date_range = (min_date, max_date)
+
+df = fetch_filtered_option_data("spx_options2", type_optie, expiration, strike, *date_range)
 
 if df.empty:
     st.error("Geen data gevonden voor de opgegeven filters.")
     st.stop()
+st.sidebar.caption(f"🧮 Data in geheugen: {schema.describe_footprint(df)}")
 
 # Filter null underlying_price weg
 df = df[df["underlying_price"].notnull()]
 
 df["formatted_date"] = pd.to_datetime(df["snapshot_date"]).dt.date
 
-min_date = df["snapshot_date"].min().date()
-max_date = df["snapshot_date"].max().date()
-date_range = st.slider("Selecteer peildatum range", min_value=min_date, max_value=max_date, value=(min_date, max_date), format="%Y-%m-%d")
-df = df[(df["snapshot_date"].dt.date >= date_range[0]) & (df["snapshot_date"].dt.date <= date_range[1])]
-
 underlying = df["underlying_price"].iloc[-1] if "underlying_price" in df.columns else None
 
-# Vectorized berekeningen
-is_put = df["type"] == "put"
-df["intrinsieke_waarde"] = (df["strike"] - df["underlying_price"]).clip(lower=0).where(is_put, (df["underlying_price"] - df["strike"]).clip(lower=0))
-df["tijdswaarde"] = df["last_price"] - df["intrinsieke_waarde"]
-
 # Dynamisch bereik helper
 def get_dynamic_scale(series):
     return [series.min() * 0.98, series.max() * 1.02]
 
 # ✅ Eén gecombineerde grafiek met dynamisch geschaalde tweede y-as (S&P)
 with st.expander(":chart_with_upwards_trend: Prijsontwikkeling van de Optieserie", expanded=True):
-    base = alt.Chart(df).encode(
-        x=alt.X("formatted_date:T", title="Peildatum (datum)", timeUnit="yearmonthdate")
-    )
+    with instrument.span("render", "prijsontwikkeling", rows=len(df)):
+        df_prices = downsample.lttb_frame(df, "snapshot_date", ["bid", "ask", "last_price", "underlying_price"])
+        base = alt.Chart(df_prices).encode(
+            x=alt.X("formatted_date:T", title="Peildatum (datum)", timeUnit="yearmonthdate")
+        )
 
-    price_lines = base.transform_fold(
-        ["bid", "ask", "last_price"],
-        as_=["Type", "Prijs"]
-    ).mark_line(point=alt.OverlayMarkDef(filled=True, size=100)).encode(
-        y=alt.Y("Prijs:Q", title="Optieprijs (linkeras)", scale=alt.Scale(domain=get_dynamic_scale(df[["bid", "ask", "last_price"]].values.flatten()))),
-        color=alt.Color("Type:N", title="Prijssoort", scale=alt.Scale(scheme="category10")),
-        tooltip=["formatted_date:T", "Type:N", "Prijs:Q"]
-    )
+        price_lines = base.transform_fold(
+            ["bid", "ask", "last_price"],
+            as_=["Type", "Prijs"]
+        ).mark_line(point=alt.OverlayMarkDef(filled=True, size=100)).encode(
+            y=alt.Y("Prijs:Q", title="Optieprijs (linkeras)", scale=alt.Scale(domain=get_dynamic_scale(df[["bid", "ask", "last_price"]].values.flatten()))),
+            color=alt.Color("Type:N", title="Prijssoort", scale=alt.Scale(scheme="category10")),
+            tooltip=["formatted_date:T", "Type:N", "Prijs:Q"]
+        )
 
-    sp_line = base.mark_line(strokeDash=[4, 4]).encode(
-        y=alt.Y(
-            "underlying_price:Q",
-            axis=alt.Axis(title="S&P Koers (rechteras)", orient="right"),
-            scale=alt.Scale(domain=get_dynamic_scale(df["underlying_price"]))
-        ),
-        color=alt.value("gray"),
-        tooltip=["formatted_date:T", "underlying_price:Q"]
-    )
+        sp_line = base.mark_line(strokeDash=[4, 4]).encode(
+            y=alt.Y(
+                "underlying_price:Q",
+                axis=alt.Axis(title="S&P Koers (rechteras)", orient="right"),
+                scale=alt.Scale(domain=get_dynamic_scale(df["underlying_price"]))
+            ),
+            color=alt.value("gray"),
+            tooltip=["formatted_date:T", "underlying_price:Q"]
+        )
 
-    combined_chart = alt.layer(price_lines, sp_line).resolve_scale(y='independent').properties(
-        height=500,
-        title="Bid, Ask, LastPrice en S&P Koers door de tijd"
-    )
+        combined_chart = alt.layer(price_lines, sp_line).resolve_scale(y='independent').properties(
+            height=500,
+            title="Bid, Ask, LastPrice en S&P Koers door de tijd"
+        )
 
-    st.altair_chart(combined_chart, use_container_width=True)
+        st.altair_chart(combined_chart, use_container_width=True)
 
 # ✅ IV & VIX met onafhankelijke assen
 with st.expander(":chart_with_upwards_trend: Implied Volatility (IV) en VIX", expanded=True):
     if "implied_volatility" in df.columns and df["implied_volatility"].notna().any():
-        df_iv = df[["formatted_date", "implied_volatility", "vix"]].dropna()
+        with instrument.span("render", "iv en vix", rows=len(df)):
+            df_iv = df[["snapshot_date", "formatted_date", "implied_volatility", "vix"]].dropna()
+            df_iv = downsample.lttb_frame(df_iv, "snapshot_date", ["implied_volatility", "vix"])
+
+            iv_line = alt.Chart(df_iv).mark_line(point=True).encode(
+                x="formatted_date:T",
+                y=alt.Y("implied_volatility:Q", title="IV (linkeras)", scale=alt.Scale(domain=get_dynamic_scale(df_iv["implied_volatility"]))),
+                color=alt.value("red"),
+                tooltip=["formatted_date:T", "implied_volatility"]
+            )
 
-        iv_line = alt.Chart(df_iv).mark_line(point=True).encode(
-            x="formatted_date:T",
-            y=alt.Y("implied_volatility:Q", title="IV (linkeras)", scale=alt.Scale(domain=get_dynamic_scale(df_iv["implied_volatility"]))),
-            color=alt.value("red"),
-            tooltip=["formatted_date:T", "implied_volatility"]
-        )
+            vix_line = alt.Chart(df_iv).mark_line(point=True).encode(
+                x="formatted_date:T",
+                y=alt.Y("vix:Q", axis=alt.Axis(title="VIX (rechteras)", orient="right"), scale=alt.Scale(domain=get_dynamic_scale(df_iv["vix"]))),
+                color=alt.value("blue"),
+                tooltip=["formatted_date:T", "vix"]
+            )
 
-        vix_line = alt.Chart(df_iv).mark_line(point=True).encode(
-            x="formatted_date:T",
-            y=alt.Y("vix:Q", axis=alt.Axis(title="VIX (rechteras)", orient="right"), scale=alt.Scale(domain=get_dynamic_scale(df_iv["vix"]))),
-            color=alt.value("blue"),
-            tooltip=["formatted_date:T", "vix"]
-        )
+            chart = alt.layer(iv_line, vix_line).resolve_scale(y='independent').properties(
+                height=300,
+                title="Implied Volatility (IV) en VIX"
+            )
 
-        chart = alt.layer(iv_line, vix_line).resolve_scale(y='independent').properties(
-            height=300,
-            title="Implied Volatility (IV) en VIX"
-        )
+            st.altair_chart(chart, use_container_width=True)
 
-        st.altair_chart(chart, use_container_width=True)
+# ✅ Greeks en IV uit de midprijs door de tijd, plus de smile van deze expiratie op de laatste peildatum
+with st.expander(":chart_with_upwards_trend: Greeks en IV-smile", expanded=True):
+    with instrument.span("compute", "greeks", rows=len(df)):
+        df_greeks = greeks.option_greeks(df)
+    df_greeks = df_greeks[df_greeks["delta"].notna()]
+    if not df_greeks.empty:
+        col1, col2 = st.columns(2)
+        with col1:
+            with instrument.span("render", "iv midprijs", rows=len(df_greeks)):
+                df_ivm = downsample.lttb_frame(df_greeks, "snapshot_date", ["iv_mid", "implied_volatility"])
+                iv_chart = alt.Chart(df_ivm).transform_fold(
+                    ["iv_mid", "implied_volatility"], as_=["Bron", "IV"]
+                ).mark_line(point=True).encode(
+                    x=alt.X("formatted_date:T", title="Peildatum (datum)"),
+                    y=alt.Y("IV:Q", title="Implied volatility", axis=alt.Axis(format="%"), scale=alt.Scale(zero=False)),
+                    color=alt.Color("Bron:N", title="Bron"),
+                    tooltip=["formatted_date:T", "Bron:N", alt.Tooltip("IV:Q", format=".2%")]
+                ).properties(height=300, title="IV uit de midprijs vs. IV van de bron")
+                st.altair_chart(iv_chart, use_container_width=True)
+        with col2:
+            greek = st.radio("Greek", ["delta", "gamma", "theta", "vega"], horizontal=True, key="series_greek")
+            with instrument.span("render", f"greek {greek}", rows=len(df_greeks)):
+                df_greek = downsample.lttb_frame(df_greeks, "snapshot_date", [greek])
+                greek_chart = alt.Chart(df_greek).mark_line(point=True).encode(
+                    x=alt.X("formatted_date:T", title="Peildatum (datum)"),
+                    y=alt.Y(f"{greek}:Q", title=greek.capitalize(), scale=alt.Scale(zero=False)),
+                    tooltip=["formatted_date:T", alt.Tooltip(f"{greek}:Q", format=".4f")]
+                ).properties(height=300, title=f"{greek.capitalize()} door de tijd (theta per dag, vega per volatiliteitspunt)")
+                st.altair_chart(greek_chart, use_container_width=True)
+
+        # Smile: alle strikes van deze expiratie op de laatste peildatum van de serie
+        last_snapshot = df["snapshot_date"].max()
+        with instrument.span("compute", "greeks keten") as event:
+            df_chain = chain.get_chain("spx_options2").snapshot(last_snapshot, type_optie)
+            df_chain = greeks.option_greeks(df_chain[df_chain["expiration"] == pd.Timestamp(expiration)])
+            event["rows"] = len(df_chain)
+        if not df_chain.empty:
+            with instrument.span("render", "iv smile", rows=len(df_chain)):
+                smile = alt.Chart(df_chain).mark_line(point=True).encode(
+                    x=alt.X("strike:Q", title="Strike", scale=alt.Scale(zero=False)),
+                    y=alt.Y("iv_mid:Q", title="IV (midprijs)", axis=alt.Axis(format="%")),
+                    tooltip=["strike:Q", alt.Tooltip("iv_mid:Q", format=".2%"), alt.Tooltip("delta:Q", format=".3f"), "mid:Q"]
+                )
+                rule = alt.Chart(pd.DataFrame({"strike": [strike]})).mark_rule(strokeDash=[4, 4], color="gray").encode(x="strike:Q")
+                st.altair_chart(alt.layer(smile, rule).properties(
+                    height=300, title=f"IV-smile {expiration:%Y-%m-%d} op {last_snapshot:%Y-%m-%d %H:%M}"
+                ).interactive(), use_container_width=True)
+    else:
+        st.info("Geen greeks te berekenen (ontbrekende prijzen of verlopen serie).")
 
 # ✅ Analyse met dubbele y-as voor PPD/intrinsiek & tijdswaarde
 with st.expander(":chart_with_upwards_trend: Analyse van Optiewaarden", expanded=True):
@@ -164,34 +208,104 @@ with st.expander(":chart_with_upwards_trend: Analyse van Optiewaarden", expanded
                 analyse_kolommen.append(kolom)
 
     if len(analyse_kolommen) > 1:
-        analysis_df = df[analyse_kolommen].dropna(subset=analyse_kolommen[1:], how="any")
-
-        if not analysis_df.empty:
-            melted_df = analysis_df.melt(id_vars="formatted_date", value_vars=analyse_kolommen[1:], var_name="Type", value_name="Waarde")
-
-            base = alt.Chart(melted_df).encode(
-                x=alt.X("formatted_date:T", title="Peildatum (datum)")
-            )
-
-            left = base.transform_filter("datum.Type != 'tijdswaarde'").mark_line(point=True).encode(
-                y=alt.Y("Waarde:Q", scale=alt.Scale(domain=get_dynamic_scale(melted_df[melted_df["Type"] != "tijdswaarde"]["Waarde"]))),
-                color=alt.Color("Type:N", scale=alt.Scale(scheme="set1")),
-                tooltip=["formatted_date:T", "Type:N", "Waarde:Q"]
-            )
-
-            right = base.transform_filter("datum.Type == 'tijdswaarde'").mark_line(point=True).encode(
-                y=alt.Y("Waarde:Q", axis=alt.Axis(title="Tijdswaarde", orient="right"), scale=alt.Scale(domain=get_dynamic_scale(melted_df[melted_df["Type"] == "tijdswaarde"]["Waarde"]))),
-                color=alt.Color("Type:N", scale=alt.Scale(scheme="set1")),
-                tooltip=["formatted_date:T", "Type:N", "Waarde:Q"]
-            )
-
-            chart = alt.layer(left, right).resolve_scale(y='independent').properties(
-                height=400,
-                title="Tijdswaarde en premium per dag (PPD)"
-            )
-
-            st.altair_chart(chart, use_container_width=True)
-        else:
-            st.info("Geen geldige numerieke data.")
+        with instrument.span("render", "optiewaarden", rows=len(df)):
+            analysis_df = df[["snapshot_date"] + analyse_kolommen].dropna(subset=analyse_kolommen[1:], how="any")
+            analysis_df = downsample.lttb_frame(analysis_df, "snapshot_date", analyse_kolommen[1:])[analyse_kolommen]
+
+            if not analysis_df.empty:
+                melted_df = analysis_df.melt(id_vars="formatted_date", value_vars=analyse_kolommen[1:], var_name="Type", value_name="Waarde")
+
+                base = alt.Chart(melted_df).encode(
+                    x=alt.X("formatted_date:T", title="Peildatum (datum)")
+                )
+
+                left = base.transform_filter("datum.Type != 'tijdswaarde'").mark_line(point=True).encode(
+                    y=alt.Y("Waarde:Q", scale=alt.Scale(domain=get_dynamic_scale(melted_df[melted_df["Type"] != "tijdswaarde"]["Waarde"]))),
+                    color=alt.Color("Type:N", scale=alt.Scale(scheme="set1")),
+                    tooltip=["formatted_date:T", "Type:N", "Waarde:Q"]
+                )
+
+                right = base.transform_filter("datum.Type == 'tijdswaarde'").mark_line(point=True).encode(
+                    y=alt.Y("Waarde:Q", axis=alt.Axis(title="Tijdswaarde", orient="right"), scale=alt.Scale(domain=get_dynamic_scale(melted_df[melted_df["Type"] == "tijdswaarde"]["Waarde"]))),
+                    color=alt.Color("Type:N", scale=alt.Scale(scheme="set1")),
+                    tooltip=["formatted_date:T", "Type:N", "Waarde:Q"]
+                )
+
+                chart = alt.layer(left, right).resolve_scale(y='independent').properties(
+                    height=400,
+                    title="Tijdswaarde en premium per dag (PPD)"
+                )
+
+                st.altair_chart(chart, use_container_width=True)
+            else:
+                st.info("Geen geldige numerieke data.")
     else:
         st.info("Niet genoeg data beschikbaar voor analysegrafiek.")
+
+# 📊 Meerdere series vergelijken: alle combinaties van de gekozen expiraties en strikes in één slice
+with st.expander(":bar_chart: Meerdere series vergelijken", expanded=False):
+    col1, col2 = st.columns(2)
+    compare_expirations = col1.multiselect(
+        "Expiraties", expirations, default=[expiration], format_func=lambda x: x.strftime("%Y-%m-%d"), key="compare_expirations",
+    )
+    ladder_strikes = catalog.strikes("spx_options2", type_optie, compare_expirations[0] if len(compare_expirations) == 1 else None)
+    position = ladder_strikes.index(strike) if strike in ladder_strikes else 0
+    compare_strikes = col2.multiselect(
+        "Strikes", ladder_strikes, default=ladder_strikes[max(position - 2, 0):position + 3], key="compare_strikes",
+    )
+    col1, col2 = st.columns(2)
+    metric = col1.selectbox("Waarde", ["last_price", "bid", "ask", "implied_volatility", "ppd", "tijdswaarde"], key="compare_metric")
+    layout = col2.radio("Weergave", ["Genormaliseerd (één grafiek)", "Small multiples"], horizontal=True, key="compare_layout")
+
+    combos = [(type_optie, e, k) for e in compare_expirations for k in compare_strikes]
+    if len(combos) > MAX_COMPARE_SERIES:
+        st.warning(f"{len(combos)} series gekozen; alleen de eerste {MAX_COMPARE_SERIES} worden getoond.")
+        combos = combos[:MAX_COMPARE_SERIES]
+
+    df_many = fetch_option_series_batch("spx_options2", combos, *date_range) if combos else pd.DataFrame()
+    if not df_many.empty:
+        df_many = df_many[df_many[metric].notna()].copy()
+        df_many["serie"] = df_many["expiration"].dt.strftime("%Y-%m-%d") + " | " + df_many["strike"].astype(str)
+        missing = len(combos) - df_many["serie"].nunique()
+        if missing:
+            st.caption(f"{missing} van de {len(combos)} series hebben geen data in deze periode.")
+
+        with instrument.span("render", "series vergelijken", rows=len(df_many), series=len(combos)):
+            # Per serie uitdunnen tot ~pixelbreedte
+            parts = [downsample.lttb_frame(g, "snapshot_date", [metric]) for _, g in df_many.groupby("serie", sort=False)]
+            df_plot = pd.concat(parts, ignore_index=True)
+            if layout.startswith("Genormaliseerd"):
+                # Index: eerste waarde in de periode = 100
+                first_value = df_plot.groupby("serie")[metric].transform("first")
+                df_plot["index"] = df_plot[metric] / first_value.where(first_value != 0) * 100
+                compare_chart = alt.Chart(df_plot).mark_line().encode(
+                    x=alt.X("snapshot_date:T", title="Peildatum"),
+                    y=alt.Y("index:Q", title=f"{metric} (eerste waarde = 100)", scale=alt.Scale(zero=False)),
+                    color=alt.Color("serie:N", title="Expiratie | strike"),
+                    tooltip=["serie:N", "snapshot_date:T", alt.Tooltip(f"{metric}:Q", format=".2f"), alt.Tooltip("index:Q", format=".1f")]
+                ).properties(height=450).interactive()
+            else:
+                compare_chart = alt.Chart(df_plot).mark_line().encode(
+                    x=alt.X("snapshot_date:T", title=None),
+                    y=alt.Y(f"{metric}:Q", title=None, scale=alt.Scale(zero=False)),
+                    tooltip=["serie:N", "snapshot_date:T", alt.Tooltip(f"{metric}:Q", format=".2f")]
+                ).properties(width=260, height=150).facet(
+                    facet=alt.Facet("serie:N", title=None), columns=3
+                ).resolve_scale(y="independent")
+            st.altair_chart(compare_chart, use_container_width=layout.startswith("Genormaliseerd"))
+    elif combos:
+        st.info("Geen data voor deze series in de gekozen periode.")
+    else:
+        st.info("Kies minstens één expiratie en één strike.")
+
+# ⬇️ Export: de gekozen serie of de volledige keten over de geselecteerde periode
+with st.expander(":inbox_tray: Export", expanded=False):
+    period = {"start": str(date_range[0]), "end": f"{date_range[1]} 23:59:59"}
+    st.markdown("**Deze optieserie**")
+    export.download_widget(
+        "Serie", "spx_options2", key="series_export",
+        name=f"spx_{type_optie}_{expiration:%Y%m%d}_{strike}",
+        filters=export.option_filters(type_optie, expiration, strike), **period,
+    )
+    st.markdown("**Volledige keten in deze periode**")
+    export.download_widget("Keten", "spx_options2", key="chain_export", name="spx_options_chain", **period)
@@ -1,19 +1,29 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from utils import get_supabase_data_in_chunks
+import schema
+import loaders
+import warmup
+import downsample
+import instrument
+import rollups
+import stats
 
 st.set_page_config(page_title="S&P 500 Dashboard", layout="wide")
 st.title("📈 S&P 500 Dashboard")
+instrument.set_page("SP500")
 
-# 🔄 Data ophalen uit Supabase
+# 🔄 Data ophalen (lokale store, stale-while-revalidate cache)
+warmup.start()
 with st.spinner("Ophalen van S&P 500 data..."):
-    df = get_supabase_data_in_chunks("sp500_delta_view")
+    df = loaders.load_sp500()
 
 if df.empty:
     st.warning("⚠️ Geen data opgehaald van Supabase.")
     st.stop()
+st.caption(f"🧮 Data in geheugen: {schema.describe_footprint(df)}")
 
 # 🔧 Conversies
 if 'date' in df.columns:
@@ -26,26 +36,55 @@ else:
 # 📆 Datumselectie
 min_date, max_date = df['date'].min(), df['date'].max()
 date_range = st.slider("Selecteer datumrange", min_value=min_date.to_pydatetime(), max_value=max_date.to_pydatetime(), value=(max_date.to_pydatetime() - pd.Timedelta(days=120), max_date.to_pydatetime()))
-df_filtered = df[(df['date'] >= date_range[0]) & (df['date'] <= date_range[1])]
+
+# 🧮 Rolling vensters over de volledige reeks en maandschetsen van de verdeling; alleen nieuwe dagen worden verwerkt
+@st.cache_resource
+def get_stats_engine():
+    return stats.SeriesStats("close", windows=(20,), sketch_columns=["daily_delta_abs", "daily_delta_pct"])
+
+engine = get_stats_engine()
+with instrument.span("compute", "statistiek bijwerken", rows=len(df)):
+    engine.update(df)
+df_filtered = engine.frame(date_range[0], date_range[1])
 
 # 📈 Lijngrafiek met MA en staafdiagram delta
-fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.7, 0.3], vertical_spacing=0.05)
-fig.add_trace(go.Scatter(x=df_filtered['date'], y=df_filtered['close'], mode='lines', name='Close'), row=1, col=1)
-fig.add_trace(go.Scatter(x=df_filtered['date'], y=df_filtered['close'].rolling(window=20).mean(), mode='lines', name='MA20'), row=1, col=1)
-fig.add_trace(go.Bar(x=df_filtered['date'], y=df_filtered['daily_delta_abs'], name='Delta abs', marker_color=['green' if x >= 0 else 'red' for x in df_filtered['daily_delta_abs']]), row=2, col=1)
+# Lange ranges uit de week-/maandrollups (candles met MA20 op de slotdag); anders dagdata,
+# uitgedund tot ~pixelbreedte: LTTB voor de lijnen, min/max per bucket voor de staven
+resolution = rollups.resolution_selector(date_range[0], date_range[1], key="sp500_resolution")
+with instrument.span("render", "koers en delta", rows=len(df_filtered), resolution=resolution):
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.7, 0.3], vertical_spacing=0.05)
+    if resolution == "dag":
+        lines = downsample.lttb_frame(df_filtered, 'date', ['close', 'ma20'])
+        bars = downsample.minmax_frame(df_filtered, 'daily_delta_abs')
+        fig.add_trace(go.Scatter(x=lines['date'], y=lines['close'], mode='lines', name='Close'), row=1, col=1)
+    else:
+        lines = rollups.sample_at(engine.frame()[['date', 'ma20']], rollups.load("sp500_delta_view", resolution, date_range[0], date_range[1]))
+        bars = lines
+        fig.add_trace(go.Candlestick(x=lines['date'], open=lines['close open'], high=lines['close high'], low=lines['close low'], close=lines['close'], name='Close'), row=1, col=1)
+    fig.add_trace(go.Scatter(x=lines['date'], y=lines['ma20'], mode='lines', name='MA20'), row=1, col=1)
+    fig.add_trace(go.Bar(x=bars['date'], y=bars['daily_delta_abs'], name='Delta abs' if resolution == "dag" else f'Delta per {resolution}', marker_color=np.where(bars['daily_delta_abs'] >= 0, 'green', 'red')), row=2, col=1)
+
+    fig.update_layout(height=600, title_text="S&P 500 Closing Price met MA20 en Dagelijkse Verandering", xaxis_rangeslider_visible=False)
+    st.plotly_chart(fig, use_container_width=True)
 
-fig.update_layout(height=600, title_text="S&P 500 Closing Price met MA20 en Dagelijkse Verandering")
-st.plotly_chart(fig, use_container_width=True)
+# 📊 Histogrammen naast elkaar, uit de samengevoegde maandschetsen (geen herberekening over alle rijen)
+def histogram_figure(sketch, title, xaxis_title):
+    edges, counts = sketch.histogram(30)
+    bar = go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges), marker_line_width=0)
+    return go.Figure(bar).update_layout(title=title, xaxis_title=xaxis_title, yaxis_title='Aantal', bargap=0)
 
-# 📊 Histogrammen naast elkaar
 col1, col2 = st.columns(2)
 
 with col1:
     st.subheader("📊 Histogram van Absolute Delta")
-    st.plotly_chart(go.Figure(go.Histogram(x=df_filtered['daily_delta_abs'], nbinsx=30)).update_layout(title='Absolute Delta Histogram', xaxis_title='Absolute Delta', yaxis_title='Aantal'), use_container_width=True)
-    st.markdown(f"**Mediaan:** {df_filtered['daily_delta_abs'].median():.2f}, **Gemiddelde:** {df_filtered['daily_delta_abs'].mean():.2f}")
+    with instrument.span("render", "histogram delta abs", rows=len(df_filtered)):
+        sketch_abs = engine.sketch('daily_delta_abs', date_range[0], date_range[1])
+        st.plotly_chart(histogram_figure(sketch_abs, 'Absolute Delta Histogram', 'Absolute Delta'), use_container_width=True)
+    st.markdown(f"**Mediaan:** {sketch_abs.quantile(0.5):.2f}, **Gemiddelde:** {sketch_abs.mean():.2f}")
 
 with col2:
     st.subheader("📊 Histogram van Procentuele Delta")
-    st.plotly_chart(go.Figure(go.Histogram(x=df_filtered['daily_delta_pct'], nbinsx=30)).update_layout(title='Procentuele Delta Histogram', xaxis_title='Procentuele Delta (%)', yaxis_title='Aantal'), use_container_width=True)
-    st.markdown(f"**Mediaan:** {df_filtered['daily_delta_pct'].median():.2f}%, **Gemiddelde:** {df_filtered['daily_delta_pct'].mean():.2f}%")
+    with instrument.span("render", "histogram delta pct", rows=len(df_filtered)):
+        sketch_pct = engine.sketch('daily_delta_pct', date_range[0], date_range[1])
+        st.plotly_chart(histogram_figure(sketch_pct, 'Procentuele Delta Histogram', 'Procentuele Delta (%)'), use_container_width=True)
+    st.markdown(f"**Mediaan:** {sketch_pct.quantile(0.5):.2f}%, **Gemiddelde:** {sketch_pct.mean():.2f}%")
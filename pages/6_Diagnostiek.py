@@ -0,0 +1,72 @@
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+import instrument
+
+st.set_page_config(page_title="Diagnostiek", layout="wide")
+st.title("🩺 Diagnostiek: query- en rendertijden")
+
+df = instrument.events()
+if df.empty:
+    st.info("Nog geen metingen. Open eerst een van de dashboards.")
+    st.stop()
+
+# === Filters
+st.sidebar.header("🔍 Filters")
+this_session = instrument.session_id()
+scope = st.sidebar.radio("Sessies", ["Deze sessie", "Alle sessies"], index=0)
+if scope == "Deze sessie":
+    df = df[(df["session"] == this_session) | (df["page"] == "achtergrond")]
+pages = sorted(df["page"].unique())
+selected_pages = st.sidebar.multiselect("Pagina's", pages, default=pages)
+kinds = sorted(df["kind"].unique())
+selected_kinds = st.sidebar.multiselect("Soort", kinds, default=kinds)
+df = df[df["page"].isin(selected_pages) & df["kind"].isin(selected_kinds)]
+if df.empty:
+    st.warning("Geen metingen voor deze filters.")
+    st.stop()
+
+# === Kerncijfers
+queries = df[df["kind"] == "query"]
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Events", f"{len(df):,}")
+col2.metric("Supabase-queries", f"{len(queries):,}")
+col3.metric("Payload", f"{queries['bytes'].sum() / 1e6:.2f} MB" if "bytes" in queries else "0 MB")
+cache_events = df[df["kind"] == "cache"]
+col4.metric("Cache hit ratio", f"{cache_events['cache'].isin(['hit', 'stale']).mean():.0%}" if not cache_events.empty else "–")
+
+# === Percentielen
+st.subheader("📊 Percentielen per meting")
+group_by = st.radio("Groeperen op", ["soort en naam", "pagina en soort"], horizontal=True)
+by = ["kind", "name"] if group_by == "soort en naam" else ["page", "kind"]
+st.dataframe(instrument.summary(df, by), use_container_width=True, hide_index=True)
+
+# === Tijdlijn
+st.subheader("🕒 Tijdlijn")
+window = st.slider("Laatste minuten", 1, 120, 10)
+recent = df[df["start"] >= df["start"].max() - pd.Timedelta(minutes=window)]
+fig = px.timeline(
+    recent, x_start="start", x_end="end", y="name", color="kind",
+    hover_data=[c for c in ["page", "ms", "rows", "bytes", "cache", "page_no", "parent"] if c in recent],
+)
+fig.update_yaxes(autorange="reversed", title=None)
+fig.update_layout(height=max(300, 22 * recent["name"].nunique()), xaxis_title="Tijd")
+st.plotly_chart(fig, use_container_width=True)
+
+# === Verdeling van de duur per pagina
+st.subheader("📈 Duur per pagina")
+fig = px.box(df, x="page", y="ms", color="kind", points=False, log_y=True)
+fig.update_layout(xaxis_title="Pagina", yaxis_title="Duur (ms)")
+st.plotly_chart(fig, use_container_width=True)
+
+# === Ruwe events en export
+with st.expander("📄 Laatste events"):
+    st.dataframe(df.sort_values("ts", ascending=False).head(500).drop(columns=["ts"]), use_container_width=True, hide_index=True)
+
+col1, col2, col3 = st.columns(3)
+col1.download_button("⬇️ Download trace (JSONL)", data=instrument.to_jsonl(df), file_name="fx_trace.jsonl")
+if col2.button("💾 Schrijf trace naar bestand"):
+    st.success(f"Trace geschreven naar {instrument.export()}")
+if col3.button("🗑️ Metingen wissen"):
+    instrument.clear()
+    st.rerun()
@@ -0,0 +1,81 @@
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+import cache
+import correlation
+import downsample
+import instrument
+import store
+import warmup
+
+st.set_page_config(page_title="Correlaties", layout="wide")
+st.title("🔗 Correlaties: FX-paren en S&P 500")
+instrument.set_page("Correlaties")
+
+# 🔄 Rolling correlatie/beta over de volledige historie; alleen nieuwe dagen worden doorgerekend
+warmup.start()
+with st.spinner("Correlaties bijwerken..."):
+    with instrument.span("compute", "correlaties bijwerken"):
+        engine = correlation.get_engine()
+
+dates = engine.dates
+if not len(dates):
+    st.warning("⚠️ Geen gemeenschappelijke FX- en S&P 500-data beschikbaar.")
+    st.stop()
+
+min_date = pd.Timestamp(dates[0]).to_pydatetime()
+max_date = pd.Timestamp(dates[-1]).to_pydatetime()
+
+# === Instellingen
+st.sidebar.header("⚙️ Instellingen")
+window = st.sidebar.select_slider("Venster (handelsdagen)", options=list(engine.windows), value=60)
+kind_label = st.sidebar.radio("Maat", ["Correlatie", "Beta"], horizontal=True)
+kind = "corr" if kind_label == "Correlatie" else "beta"
+st.sidebar.caption("Beta: gevoeligheid van de rij voor de kolom (cov / var van de kolom), op log-rendementen.")
+
+data_version = (store.get_version("fx_rates"), store.get_version("sp500_delta_view"), len(dates))
+
+# === Matrix
+st.subheader(f"🧩 {kind_label}matrix ({window} dagen)")
+matrix_date = st.slider("Datum", min_value=min_date, max_value=max_date, value=max_date, format="YYYY-MM-DD")
+
+def matrix_figure():
+    matrix = engine.matrix(window, matrix_date, kind=kind)
+    limit = 1.0 if kind == "corr" else max(float(matrix.abs().max().max()), 1e-9)
+    fig = px.imshow(matrix, text_auto=".2f", zmin=-limit, zmax=limit, color_continuous_scale="RdBu", aspect="auto")
+    fig.update_layout(xaxis_title=None, yaxis_title=None, coloraxis_colorbar=dict(title=kind_label))
+    return fig
+
+with instrument.span("render", "matrix", window=window):
+    cache.plotly_chart(("correlatie matrix", window, kind, matrix_date, data_version), matrix_figure, name="correlatie matrix")
+
+# === Tijdreeks per combinatie
+st.subheader(f"📈 Rolling {kind_label.lower()} door de tijd")
+combinations = [(a, b) for a in engine.columns for b in engine.columns if a != b]
+labels = {f"{a} ~ {b}": (a, b) for a, b in combinations}
+default = [f"{p} ~ {correlation.SPX}" for p in engine.columns[:2] if p != correlation.SPX]
+selected = st.multiselect("Combinaties (rij ~ kolom)", list(labels), default=default)
+period = st.slider(
+    "Periode", min_value=min_date, max_value=max_date,
+    value=(max(min_date, max_date - pd.Timedelta(days=730)), max_date), format="YYYY-MM-DD",
+)
+
+def series_figure(names):
+    frames = []
+    for name in names:
+        a, b = labels[name]
+        s = engine.series(window, a, b, period[0], period[1], kind=kind).dropna()
+        frames.append(downsample.lttb_frame(s, "date", ["waarde"]).assign(combinatie=name))
+    data = pd.concat(frames, ignore_index=True)
+    fig = px.line(data, x="date", y="waarde", color="combinatie")
+    fig.add_hline(y=0, line_dash="dot", line_color="grey")
+    fig.update_layout(xaxis_title="Datum", yaxis_title=kind_label,
+                      legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
+    return fig
+
+if selected:
+    with instrument.span("render", "tijdreeks", window=window, series=len(selected)):
+        cache.plotly_chart(("correlatie reeks", window, kind, tuple(selected), period, data_version),
+                           lambda: series_figure(selected), name="correlatie reeks")
+else:
+    st.info("Kies minstens één combinatie.")
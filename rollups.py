@@ -0,0 +1,164 @@
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+import instrument
+import loaders
+import schema
+import store
+
+# Voorgeaggregeerde week- en maandreeksen (OHLC per kolom) naast de dagdata in de store. Bij een
+# nieuwe dataversie (store.get_version) wordt alleen vanaf de periode met de vorige watermark opnieuw
+# geaggregeerd. 'date' is de
+# laatste handelsdag van de periode, zodat dagindicatoren op die datum exact aansluiten.
+RESOLUTIONS = {"week": "W-FRI", "maand": "M"}
+# Minimaal aantal punten dat een grafiek moet vullen voordat een grovere resolutie wordt gekozen
+MIN_POINTS = int(os.getenv("FX_CHART_MIN_POINTS", "250"))
+
+# tabel -> (kolommen van de dagview, OHLC-kolommen)
+SOURCES = {
+    "fx_rates": ("fx", list(loaders.FX_PAIRS)),
+    "sp500_delta_view": ("sp500", ["close"]),
+}
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def _rollup_dir(table_name: str):
+    return store.STORE_DIR / table_name / "_rollups"
+
+
+def _daily(table_name: str, start=None) -> pd.DataFrame:
+    view, _ = SOURCES[table_name]
+    df = store.load_table(table_name, start=start, columns=schema.columns(view))
+    if df.empty:
+        return df
+    return loaders.add_fx_pairs(df) if table_name == "fx_rates" else df.dropna(subset=["date"])
+
+
+def aggregate(df: pd.DataFrame, freq: str, columns) -> pd.DataFrame:
+    """OHLC per periode; '<kolom>' is de slotwaarde, zodat lijngrafieken de dagkolommen kunnen hergebruiken."""
+    period = df["date"].dt.to_period(freq)
+    grouped = df.groupby(period, sort=True)
+    out = {"period": grouped["date"].first().index.start_time, "date": grouped["date"].max().to_numpy(), "dagen": grouped.size().to_numpy()}
+    for column in columns:
+        values = grouped[column]
+        out[f"{column} open"] = values.first().to_numpy()
+        out[f"{column} high"] = values.max().to_numpy()
+        out[f"{column} low"] = values.min().to_numpy()
+        out[column] = values.last().to_numpy()
+    return pd.DataFrame(out)
+
+
+def _with_changes(table_name: str, rollup: pd.DataFrame) -> pd.DataFrame:
+    # Verandering t.o.v. de vorige periode (zelfde kolomnamen als de dagview)
+    if table_name == "sp500_delta_view" and not rollup.empty:
+        previous = rollup["close"].shift()
+        rollup["daily_delta_abs"] = rollup["close"] - previous
+        rollup["daily_delta_pct"] = (rollup["close"] / previous - 1) * 100
+    return rollup
+
+
+def _read(table_name: str):
+    path = _rollup_dir(table_name)
+    if not (path / "meta.json").exists():
+        return {}, {}
+    meta = json.loads((path / "meta.json").read_text())
+    return meta, {res: pd.read_parquet(path / f"{res}.parquet") for res in RESOLUTIONS}
+
+
+def _write(table_name: str, meta: dict, rollups: dict) -> None:
+    path = _rollup_dir(table_name)
+    path.mkdir(parents=True, exist_ok=True)
+    for res, df in rollups.items():
+        target = path / f"{res}.parquet"
+        tmp = store.temp_path(target)
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, target)
+    tmp = store.temp_path(path / "meta.json")
+    tmp.write_text(json.dumps(meta))
+    os.replace(tmp, path / "meta.json")
+
+
+def refresh(table_name: str) -> dict:
+    """Werk de rollups bij tot de dataversie van de store; alleen de laatste (onvolledige) periodes worden herberekend."""
+    version = store.get_version(table_name)
+    cached = _cache.get(table_name)
+    if cached and cached[0] == version:
+        return cached[1]
+    # Ook andere workers delen STORE_DIR: de hele refresh onder het bestandsslot, en binnen het
+    # slot opnieuw lezen wat een ander proces intussen heeft weggeschreven
+    with _lock, store.file_lock(_rollup_dir(table_name).with_suffix(".lock")):
+        version = store.get_version(table_name)
+        cached = _cache.get(table_name)
+        if cached and cached[0] == version:
+            return cached[1]
+        meta, rollups = _read(table_name)
+        stored_wm = meta.get("watermark")
+        if version is not None and meta.get("version") != version:
+            watermark = store.get_watermark(table_name)
+            with instrument.span("compute", f"rollups {table_name}") as event:
+                _, columns = SOURCES[table_name]
+                # Vanaf het begin van de oudste periode die de vorige watermark bevat
+                cuts = {
+                    res: pd.Timestamp(stored_wm).to_period(freq).start_time if stored_wm and res in rollups else None
+                    for res, freq in RESOLUTIONS.items()
+                }
+                start = None if any(c is None for c in cuts.values()) else min(cuts.values())
+                daily = _daily(table_name, start)
+                event["rows"] = len(daily)
+                for res, freq in RESOLUTIONS.items():
+                    new = aggregate(daily, freq, columns) if not daily.empty else pd.DataFrame()
+                    old = rollups.get(res)
+                    if cuts[res] is not None and old is not None:
+                        # De dagdata begint bij de vroegste cut: alleen periodes vanaf de eigen cut zijn volledig
+                        if not new.empty:
+                            new = new[new["period"] >= cuts[res]]
+                        new = pd.concat([old[old["period"] < cuts[res]], new], ignore_index=True)
+                    rollups[res] = _with_changes(table_name, new)
+                _write(table_name, {"watermark": watermark.isoformat(), "version": version}, rollups)
+        _cache[table_name] = (version, rollups)
+        return rollups
+
+
+def load(table_name: str, resolution: str, start=None, end=None) -> pd.DataFrame:
+    """Rollup-rijen waarvan de slotdatum binnen [start, end] valt."""
+    df = refresh(table_name).get(resolution)
+    if df is None or df.empty:
+        return pd.DataFrame()
+    mask = np.ones(len(df), dtype=bool)
+    if start is not None:
+        mask &= (df["date"] >= pd.Timestamp(start)).to_numpy()
+    if end is not None:
+        mask &= (df["date"] <= pd.Timestamp(end)).to_numpy()
+    return df[mask].reset_index(drop=True)
+
+
+def choose_resolution(start, end, min_points: int = MIN_POINTS) -> str:
+    """Grofste resolutie die het venster nog met minstens min_points punten vult."""
+    days = (pd.Timestamp(end) - pd.Timestamp(start)).days + 1
+    estimated = {"maand": days / 30.44, "week": days / 7}
+    for resolution in ["maand", "week"]:
+        if estimated[resolution] >= min_points:
+            return resolution
+    return "dag"
+
+
+def resolution_selector(start, end, key: str) -> str:
+    """Sidebar-keuze met 'auto' als standaard; geeft de gekozen resolutie terug."""
+    import streamlit as st
+
+    auto = choose_resolution(start, end)
+    choice = st.sidebar.selectbox("🔎 Resolutie", ["auto", "dag", *RESOLUTIONS], key=key,
+                                  format_func=lambda r: f"auto ({auto})" if r == "auto" else r)
+    return auto if choice == "auto" else choice
+
+
+def sample_at(daily: pd.DataFrame, rollup: pd.DataFrame) -> pd.DataFrame:
+    """Voeg dagwaarden (bv. indicatoren) op de slotdatum van elke periode aan de rollup toe."""
+    extra = [c for c in daily.columns if c == "date" or c not in rollup.columns]
+    return rollup.merge(daily[extra], on="date", how="left")
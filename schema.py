@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+# Kolommen en compacte dtypes per tabel. Alleen deze kolommen worden opgehaald en opgeslagen.
+# Verhoog SCHEMA_VERSION bij een wijziging: de lokale store wordt dan opnieuw opgebouwd.
+SCHEMA_VERSION = 2
+
+TABLES = {
+    "fx_rates": {
+        "date": "date",
+        "eur_usd": "float32",
+        "usd_jpy": "float32",
+        "gbp_usd": "float32",
+        "aud_usd": "float32",
+        "usd_chf": "float32",
+    },
+    "sp500_delta_view": {
+        "date": "date",
+        "close": "float32",
+        "daily_delta_abs": "float32",
+        "daily_delta_pct": "float32",
+    },
+    "spx_options2": {
+        "id": "int64",
+        "snapshot_date": "timestamp",
+        "type": "category",
+        "expiration": "date",
+        "strike": "int32",
+        "bid": "float32",
+        "ask": "float32",
+        "last_price": "float32",
+        "implied_volatility": "float32",
+        "underlying_price": "float32",
+        "vix": "float32",
+    },
+}
+
+# Kolommen die lokaal worden afgeleid (zie derived.py) en dus niet bij Supabase worden opgevraagd
+DERIVED = {
+    "spx_options2": {
+        "days_to_maturity": "int32",
+        "ppd": "float32",
+        "intrinsieke_waarde": "float32",
+        "tijdswaarde": "float32",
+    },
+}
+
+# Kolommen die elke weergave nodig heeft (projectie bij het lezen)
+VIEWS = {
+    "fx": ("fx_rates", ["date", "eur_usd", "usd_jpy", "gbp_usd", "aud_usd", "usd_chf"]),
+    "sp500": ("sp500_delta_view", ["date", "close", "daily_delta_abs", "daily_delta_pct"]),
+    "ppd": ("spx_options2", ["snapshot_date", "type", "expiration", "strike", "bid", "days_to_maturity", "ppd"]),
+    "option_series": ("spx_options2", [
+        "snapshot_date", "bid", "ask", "last_price", "implied_volatility", "underlying_price", "vix",
+        "type", "expiration", "strike", "days_to_maturity", "ppd", "intrinsieke_waarde", "tijdswaarde",
+    ]),
+}
+
+
+def columns(name: str) -> list:
+    """Kolommen van een weergave (VIEWS) of, als die niet bestaat, van een hele tabel."""
+    if name in VIEWS:
+        return list(VIEWS[name][1])
+    return list(TABLES[name])
+
+
+def select_clause(name: str) -> str:
+    return ", ".join(columns(name))
+
+
+def _convert(values, kind: str):
+    if kind == "timestamp":
+        return pd.to_datetime(values, utc=True, errors="coerce", format="ISO8601")
+    if kind == "date":
+        parsed = pd.to_datetime(values, errors="coerce", format="ISO8601")
+        if getattr(parsed, "tz", None) is not None:
+            parsed = parsed.tz_convert(None)
+        return parsed
+    if kind == "category":
+        return pd.Categorical(values)
+    if kind == "float32":
+        return pd.to_numeric(pd.Series(values, dtype="object"), errors="coerce").to_numpy(dtype=np.float32)
+    # gehele getallen: numpy-int als er geen lege waarden zijn, anders nullable
+    numbers = pd.to_numeric(pd.Series(values, dtype="object"), errors="coerce")
+    if numbers.isna().any():
+        return numbers.astype(kind.capitalize()).array
+    return numbers.to_numpy(dtype=kind)
+
+
+def decode(table_name: str, rows: list, columns=None) -> pd.DataFrame:
+    """Bouw direct een getypeerd DataFrame uit een lijst JSON-rijen, kolom voor kolom.
+
+    Zonder rijen komen de opgevraagde kolommen (standaard alle) leeg maar met dezelfde dtypes terug.
+    """
+    spec = TABLES[table_name]
+    present = [c for c in (rows[0] if rows else columns or spec) if c in spec]
+    data = {c: _convert([r.get(c) for r in rows], spec[c]) for c in present}
+    return pd.DataFrame(data)
+
+
+def coerce(table_name: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Zet een bestaand DataFrame (bv. na concat) terug naar de compacte dtypes van het schema."""
+    spec = {**TABLES[table_name], **DERIVED.get(table_name, {})}
+    for c in df.columns:
+        if c in spec:
+            kind = spec[c]
+            if kind in ("timestamp", "date"):
+                if not pd.api.types.is_datetime64_any_dtype(df[c]):
+                    df[c] = _convert(df[c], kind)
+            elif kind == "category":
+                df[c] = df[c].astype("category")
+            elif str(df[c].dtype).lower() != kind:
+                df[c] = _convert(df[c].tolist(), kind)
+    return df
+
+
+def memory_footprint(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True).sum())
+
+
+def format_bytes(n: int) -> str:
+    for unit in ["B", "KB", "MB", "GB"]:
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def describe_footprint(df: pd.DataFrame) -> str:
+    return f"{len(df):,} rijen, {format_bytes(memory_footprint(df))}"
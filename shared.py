@@ -0,0 +1,104 @@
+import hashlib
+import os
+import re
+import weakref
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+import instrument
+import store
+
+# Gedeelde cache tussen Streamlit-processen op dezelfde machine: een resultaat wordt één keer
+# (onder een bestandsslot) als ongecomprimeerd Arrow-bestand geschreven en door elk proces via
+# memory-mapping gelezen. Numerieke en datumkolommen wijzen dan rechtstreeks naar de page cache
+# van het OS, dus alle workers delen één kopie in het geheugen.
+SHARED_DIR = store.STORE_DIR / "_shared"
+ENABLED = os.getenv("FX_SHARED_CACHE", "1") != "0"
+
+# id(frame) -> weakref, om gedeelde (alleen-lezen) frames te herkennen
+_attached = {}
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+
+
+def _path(name: str, version) -> Path:
+    digest = hashlib.sha1(str(version).encode()).hexdigest()[:12]
+    return SHARED_DIR / f"{_slug(name)}.{digest}.arrow"
+
+
+def _column(series: pd.Series) -> pa.Array:
+    # NaN blijft NaN (geen null-bitmap), zodat de kolom bij het lezen zonder kopie terugkomt
+    if series.dtype.kind in "fiub":
+        return pa.array(series.to_numpy(), from_pandas=False)
+    return pa.Array.from_pandas(series)
+
+
+def write_frame(path, df: pd.DataFrame) -> int:
+    """Schrijf df als Arrow IPC-bestand (atomisch); geeft de bestandsgrootte terug."""
+    df = df.reset_index(drop=True)
+    table = pa.table({c: _column(df[c]) for c in df.columns})
+    # pandas-metadata voor het terugzetten van dtypes (category, tijdzone)
+    table = table.replace_schema_metadata(pa.Schema.from_pandas(df, preserve_index=False).metadata)
+    tmp = store.temp_path(path)
+    with pa.OSFile(str(tmp), "wb") as sink:
+        with ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+    return os.path.getsize(path)
+
+
+def read_frame(path) -> pd.DataFrame:
+    """Koppel een Arrow-bestand via mmap; kolommen zonder conversie delen het geheugen met andere processen."""
+    table = ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+    df = table.to_pandas(split_blocks=True)
+    _attached[id(df)] = weakref.ref(df, lambda _, key=id(df): _attached.pop(key, None))
+    return df
+
+
+def is_shared(df) -> bool:
+    ref = _attached.get(id(df))
+    return ref is not None and ref() is df
+
+
+def _prune(name: str, keep) -> None:
+    # Oudere versies opruimen; processen die ze nog gemapt hebben houden hun kopie tot ze loslaten
+    for path in SHARED_DIR.glob(f"{_slug(name)}.*.arrow"):
+        if path != keep:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+def get_frame(name: str, version, build) -> pd.DataFrame:
+    """Resultaat van build() voor (name, version), gedeeld tussen processen.
+
+    Het eerste proces bouwt en schrijft het bestand; de rest wacht op het slot en koppelt het
+    daarna alleen. Het resultaat is alleen-lezen: pas een kopie aan, niet het frame zelf.
+    Gebruik als version de dataversie van de brontabel (store.get_version), niet de watermark:
+    een aangevulde snapshot verandert de data zonder de watermark te verplaatsen.
+    """
+    if not ENABLED or version is None:
+        return build()
+    path = _path(name, version)
+    with instrument.span("cache", f"gedeeld {name}") as event:
+        event["cache"] = "hit"
+        if not path.exists():
+            with store.file_lock(SHARED_DIR / f"{_slug(name)}.lock"):
+                if not path.exists():
+                    event["cache"] = "miss"
+                    event["bytes"] = write_frame(path, build())
+                    _prune(name, path)
+        try:
+            df = read_frame(path)
+        except FileNotFoundError:
+            # Net vervangen door een nieuwere versie: dan zelf opbouwen
+            event["cache"] = "miss"
+            df = build()
+        event["rows"] = len(df)
+        return df
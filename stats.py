@@ -0,0 +1,215 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from indicators import rolling_mean_std
+
+# Statistiek over een volledige dagreeks: rolling vensters worden één keer over de hele reeks
+# berekend (met opwarmperiode), en per maand wordt een samenvoegbare schets van de verdeling
+# bewaard. Een datumvenster combineert de schetsen van de volledige maanden en leest alleen de
+# rijen van de twee randmaanden opnieuw.
+ALPHA = 0.005  # relatieve nauwkeurigheid van de kwantielen
+GAMMA = (1 + ALPHA) / (1 - ALPHA)
+MIN_VALUE = 1e-9  # |x| hieronder telt als nul
+
+
+class Sketch:
+    """Samenvoegbare verdelingsschets (DDSketch): logaritmische buckets plus exact aantal, som, min en max."""
+
+    def __init__(self, keys=None, counts=None, zeros: int = 0, total: float = 0.0, minimum=np.inf, maximum=-np.inf):
+        # keys: teken * (bucket + 2**20), zodat positieve en negatieve buckets in één array passen
+        self.keys = np.empty(0, dtype=np.int64) if keys is None else keys
+        self.counts = np.empty(0, dtype=np.int64) if counts is None else counts
+        self.zeros = zeros
+        self.total = total
+        self.minimum = minimum
+        self.maximum = maximum
+
+    @classmethod
+    def from_values(cls, values) -> "Sketch":
+        x = np.asarray(values, dtype=np.float64)
+        x = x[~np.isnan(x)]
+        if not len(x):
+            return cls()
+        nonzero = np.abs(x) > MIN_VALUE
+        buckets = np.ceil(np.log(np.abs(x[nonzero])) / np.log(GAMMA)).astype(np.int64)
+        keys, counts = np.unique(_encode(np.sign(x[nonzero]), buckets), return_counts=True)
+        return cls(keys, counts, int((~nonzero).sum()), float(x.sum()), float(x.min()), float(x.max()))
+
+    @property
+    def count(self) -> int:
+        return int(self.counts.sum()) + self.zeros
+
+    def merge(self, other: "Sketch") -> "Sketch":
+        return Sketch.combine([self, other])
+
+    @classmethod
+    def combine(cls, sketches) -> "Sketch":
+        """Voeg een reeks schetsen in één keer samen."""
+        sketches = list(sketches)
+        if not sketches:
+            return cls()
+        keys, inverse = np.unique(np.concatenate([s.keys for s in sketches]), return_inverse=True)
+        counts = np.bincount(inverse, weights=np.concatenate([s.counts for s in sketches]), minlength=len(keys))
+        return cls(keys, counts.astype(np.int64), sum(s.zeros for s in sketches), sum(s.total for s in sketches),
+                   min(s.minimum for s in sketches), max(s.maximum for s in sketches))
+
+    def _points(self):
+        # Representatieve waarde per bucket, oplopend gesorteerd
+        values = np.concatenate([_decode(self.keys), [0.0]])
+        counts = np.concatenate([self.counts, [self.zeros]])
+        order = np.argsort(values, kind="stable")
+        return values[order], counts[order]
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return np.nan
+        values, counts = self._points()
+        rank = q * (self.count - 1)
+        cumulative = np.cumsum(counts)
+        # Lineaire interpolatie tussen de twee omliggende rangen (zoals pandas)
+        lo = values[np.searchsorted(cumulative, np.floor(rank), side="right")]
+        hi = values[np.searchsorted(cumulative, np.ceil(rank), side="right")]
+        value = lo + (hi - lo) * (rank - np.floor(rank))
+        return float(np.clip(value, self.minimum, self.maximum))
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else np.nan
+
+    def histogram(self, bins: int = 30):
+        """Histogram over [min, max] met gelijke bins; elke bucket telt mee op zijn representatieve waarde."""
+        if not self.count:
+            return np.array([]), np.array([])
+        values, counts = self._points()
+        values = np.clip(values, self.minimum, self.maximum)
+        edges = np.linspace(self.minimum, self.maximum, bins + 1) if self.maximum > self.minimum else \
+            np.array([self.minimum - 0.5, self.maximum + 0.5])
+        hist, edges = np.histogram(values, bins=edges, weights=counts)
+        return edges, hist.astype(np.int64)
+
+
+def _encode(signs, buckets):
+    # Bucketindex kan negatief zijn (|x| < 1); verschuif zodat elk teken een eigen bereik heeft
+    return signs.astype(np.int64) * (buckets.astype(np.int64) + (1 << 20))
+
+
+def _decode(keys) -> np.ndarray:
+    signs = np.sign(keys)
+    buckets = np.abs(keys) - (1 << 20)
+    return signs * 2 * GAMMA ** buckets / (GAMMA + 1)
+
+
+class SeriesStats:
+    """Rolling gemiddelde/standaardafwijking over de volledige reeks en maandschetsen per kolom.
+
+    update() verwerkt alleen nieuwe dagen: de rolling vensters worden vanaf window - 1 rijen terug
+    doorgerekend en alleen de maandschetsen vanaf de eerste nieuwe dag worden opnieuw opgebouwd.
+    """
+
+    def __init__(self, rolling_column: str, windows=(20,), sketch_columns=(), date_column: str = "date"):
+        self.rolling_column = rolling_column
+        self.windows = tuple(windows)
+        self.sketch_columns = list(sketch_columns)
+        self.date_column = date_column
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        # (reeks, maandschetsen) als één geheel: update() bouwt een nieuwe versie en vervangt hem met
+        # één toewijzing, lezers halen hem één keer per aanroep op
+        self._state = (pd.DataFrame(), {c: {} for c in self.sketch_columns})
+
+    @property
+    def data(self) -> pd.DataFrame:
+        return self._state[0]
+
+    @property
+    def sketches(self) -> dict:
+        return self._state[1]
+
+    def _months(self, dates: pd.Series) -> pd.Series:
+        return dates.dt.to_period("M")
+
+    def _rolling(self, values: np.ndarray) -> dict:
+        out = {}
+        for window in self.windows:
+            mean, std = rolling_mean_std(values.reshape(-1, 1), window)
+            out[f"ma{window}"] = mean[:, 0]
+            out[f"std{window}"] = std[:, 0]
+        return out
+
+    def update(self, df: pd.DataFrame) -> int:
+        """Verwerk nieuwe rijen; geeft het aantal verwerkte rijen terug."""
+        columns = [self.date_column, self.rolling_column, *self.sketch_columns]
+        df = df[columns].dropna(subset=[self.date_column]).sort_values(self.date_column).reset_index(drop=True)
+        with self.lock:
+            data, sketches = self._state
+            n_old = len(data)
+            same_history = n_old and len(df) >= n_old and df[self.date_column].iloc[n_old - 1] == data[self.date_column].iloc[-1] \
+                and df[self.rolling_column].iloc[n_old - 1] == data[self.rolling_column].iloc[-1]
+            if not same_history:
+                data, sketches = pd.DataFrame(), {c: {} for c in self.sketch_columns}
+                n_old = 0
+            if len(df) == n_old:
+                self._state = (data, sketches)
+                return 0
+
+            # Rolling: alleen de nieuwe rijen, met de laatste window - 1 oude rijen als opwarmperiode
+            warm = max(self.windows, default=1) - 1
+            begin = max(n_old - warm, 0)
+            rolled = self._rolling(df[self.rolling_column].to_numpy(np.float64)[begin:])
+            new = df.iloc[n_old:].copy()
+            for name, values in rolled.items():
+                new[name] = values[n_old - begin:]
+            data = pd.concat([data, new], ignore_index=True) if n_old else new.reset_index(drop=True)
+
+            # Maandschetsen: vanaf de maand van de eerste nieuwe rij opnieuw opbouwen
+            first_month = self._months(new[self.date_column]).iloc[0]
+            tail = data[self._months(data[self.date_column]) >= first_month]
+            months = self._months(tail[self.date_column])
+            sketches = {c: dict(sketches[c]) for c in self.sketch_columns}
+            for column in self.sketch_columns:
+                for month, values in tail[column].groupby(months):
+                    sketches[column][month] = Sketch.from_values(values.to_numpy())
+            self._state = (data, sketches)
+            return len(new)
+
+    def frame(self, start=None, end=None) -> pd.DataFrame:
+        """Venster uit de volledige reeks, inclusief de rolling kolommen (geen NaN-aanloop)."""
+        return self._window(self.data, start, end)
+
+    def _window(self, data: pd.DataFrame, start, end) -> pd.DataFrame:
+        mask = np.ones(len(data), dtype=bool)
+        if start is not None:
+            mask &= (data[self.date_column] >= pd.Timestamp(start)).to_numpy()
+        if end is not None:
+            mask &= (data[self.date_column] <= pd.Timestamp(end)).to_numpy()
+        return data[mask]
+
+    def sketch(self, column: str, start=None, end=None) -> Sketch:
+        """Schets van de verdeling binnen [start, end]: volledige maanden uit de cache, randmaanden uit de rijen."""
+        data, sketches = self._state
+        sketches = sketches[column]
+        if not sketches:
+            return Sketch()
+        months = sorted(sketches)
+        first = pd.Timestamp(start).to_period("M") if start is not None else months[0]
+        last = pd.Timestamp(end).to_period("M") if end is not None else months[-1]
+        parts = []
+        for month in months:
+            if month < first or month > last:
+                continue
+            if _covers(month, start, end):
+                parts.append(sketches[month])
+            else:
+                # Randmaand die maar deels in het venster valt
+                lo = max(pd.Timestamp(start), month.start_time) if start is not None else month.start_time
+                hi = min(pd.Timestamp(end), month.end_time) if end is not None else month.end_time
+                parts.append(Sketch.from_values(self._window(data, lo, hi)[column].to_numpy()))
+        return Sketch.combine(parts)
+
+
+def _covers(month: pd.Period, start, end) -> bool:
+    return (start is None or pd.Timestamp(start) <= month.start_time) and \
+           (end is None or pd.Timestamp(end) >= month.end_time.normalize())
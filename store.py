@@ -0,0 +1,262 @@
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: alleen vergrendeling binnen het proces
+    fcntl = None
+
+import derived
+import instrument
+import schema
+from utils import FETCH_WORKERS, get_supabase_data_in_chunks
+
+# Lokale kolomopslag (Parquet) voor de Supabase-tabellen. Per tabel een map met
+# één bestand per partitie en een _meta.json met de high-water mark en een dataversie die bij
+# elke gewijzigde partitie ophoogt (ook als de watermark gelijk blijft).
+STORE_DIR = Path(os.getenv("FX_STORE_DIR", Path(__file__).parent / "data"))
+
+# tabel -> watermark-kolom, unieke keyset-sleutel en partitieformaat (jaar of dag)
+TABLES = {
+    "fx_rates": {"watermark": "date", "key": "date", "partition": "%Y", "utc": False},
+    "sp500_delta_view": {"watermark": "date", "key": "date", "partition": "%Y", "utc": False},
+    "spx_options2": {"watermark": "snapshot_date", "key": ("snapshot_date", "id"), "partition": "%Y-%m-%d", "utc": True},
+}
+
+# Minimale tijd tussen twee syncs van dezelfde tabel (seconden)
+SYNC_INTERVAL = int(os.getenv("FX_STORE_SYNC_INTERVAL", "300"))
+
+
+def _table_dir(table_name: str) -> Path:
+    return STORE_DIR / table_name
+
+
+_local_locks = {}
+_local_locks_lock = threading.Lock()
+
+
+@contextmanager
+def file_lock(path: Path):
+    """Exclusieve vergrendeling over processen heen (flock op een lockbestand naast de data)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if fcntl is None:
+        with _local_locks_lock:
+            lock = _local_locks.setdefault(str(path), threading.Lock())
+        with lock:
+            yield
+        return
+    with open(path, "a") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def temp_path(path: Path) -> Path:
+    """Unieke tijdelijke naam naast path (per proces en thread), voor schrijven gevolgd door os.replace."""
+    return path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def _read_meta(table_name: str) -> dict:
+    path = _table_dir(table_name) / "_meta.json"
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def _write_meta(table_dir: Path, meta: dict) -> None:
+    path = table_dir / "_meta.json"
+    tmp = temp_path(path)
+    tmp.write_text(json.dumps(meta))
+    os.replace(tmp, path)
+
+
+def _write_partition(path: Path, df: pd.DataFrame) -> None:
+    # Eerst naar een tijdelijk bestand schrijven zodat lezers nooit een half bestand zien
+    tmp = temp_path(path)
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def _to_datetime(series: pd.Series, utc: bool) -> pd.Series:
+    return pd.to_datetime(series, utc=utc, errors="coerce")
+
+
+def get_watermark(table_name: str) -> pd.Timestamp | None:
+    value = _read_meta(table_name).get("watermark")
+    return pd.Timestamp(value) if value else None
+
+
+def get_version(table_name: str) -> int | None:
+    """Dataversie van de tabel (None bij een lege store).
+
+    Hoogt op bij elke partitie die een sync herschrijft, ook als een onvolledige snapshot op de
+    bestaande watermark wordt aangevuld. Afgeleide caches gebruiken dit als sleutel, de watermark
+    alleen als beginpunt voor het incrementeel bijlezen.
+    """
+    meta = _read_meta(table_name)
+    return meta.get("version", 0) if meta.get("watermark") else None
+
+
+def sync_table(table_name: str, force: bool = False) -> int:
+    """Haal alleen rijen op vanaf de opgeslagen watermark en voeg ze toe aan de store.
+
+    Geeft het aantal opgehaalde rijen terug.
+    """
+    meta = _read_meta(table_name)
+    if not force and meta.get("schema") == schema.SCHEMA_VERSION and time.time() - meta.get("last_sync", 0) < SYNC_INTERVAL:
+        return 0
+    # Eén proces tegelijk synct; wie op het slot heeft gewacht, ziet daarna de sync van de ander
+    with file_lock(_table_dir(table_name).with_suffix(".lock")):
+        current = _read_meta(table_name)
+        if current.get("last_sync", 0) > meta.get("last_sync", 0) and current.get("schema") == schema.SCHEMA_VERSION:
+            return 0
+        return _sync_locked(table_name, current, force)
+
+
+def _sync_locked(table_name: str, meta: dict, force: bool) -> int:
+    spec = TABLES[table_name]
+    col = spec["watermark"]
+    live_dir = table_dir = _table_dir(table_name)
+    if meta and meta.get("schema") != schema.SCHEMA_VERSION:
+        # Opgeslagen met een ander schema: tabel in een nieuwe map opnieuw opbouwen en daarna
+        # omwisselen, zodat lezers in andere processen hun partities niet onder zich zien verdwijnen.
+        # De dataversie loopt door, zodat geen oude cache-sleutel opnieuw geldig wordt.
+        table_dir = temp_path(live_dir)
+        meta = {"version": meta.get("version", 0) + 1}
+    elif not force and time.time() - meta.get("last_sync", 0) < SYNC_INTERVAL:
+        return 0
+
+    with instrument.span("store", f"sync {table_name}") as event:
+        watermark = meta.get("watermark")
+        filters = None
+        if watermark:
+            # gte i.p.v. gt: een snapshot die tijdens de vorige sync nog niet compleet was wordt opnieuw opgehaald
+            value = pd.Timestamp(watermark)
+            filters = [("gte", col, value.isoformat() if spec["utc"] else value.strftime("%Y-%m-%d"))]
+        new = get_supabase_data_in_chunks(
+            table_name,
+            columns=schema.select_clause(table_name),
+            filters=filters,
+            keyset=spec["key"],
+            workers=FETCH_WORKERS,
+            typed=True,
+        )
+
+        table_dir.mkdir(parents=True, exist_ok=True)
+        if not new.empty:
+            new[col] = _to_datetime(new[col], spec["utc"])
+            new = derived.add_metrics(table_name, new.dropna(subset=[col]))
+            keys = new[col].dt.strftime(spec["partition"])
+            for key, part in new.groupby(keys):
+                path = table_dir / f"{key}.parquet"
+                if path.exists():
+                    existing = schema.coerce(table_name, pd.read_parquet(path))
+                    old = existing[existing[col] < pd.Timestamp(watermark)] if watermark else existing
+                    part = schema.coerce(table_name, pd.concat([old, part], ignore_index=True))
+                    part = part.sort_values(col, kind="stable").reset_index(drop=True)
+                    if part.equals(existing):
+                        # Opnieuw gelezen snapshot is ongewijzigd: geen nieuwe dataversie
+                        continue
+                else:
+                    part = part.sort_values(col, kind="stable")
+                _write_partition(path, part)
+                meta["version"] = meta.get("version", 0) + 1
+            meta["watermark"] = new[col].max().isoformat()
+        event["rows"] = len(new)
+
+    meta["schema"] = schema.SCHEMA_VERSION
+    meta["last_sync"] = time.time()
+    _write_meta(table_dir, meta)
+    if table_dir != live_dir:
+        stale = live_dir.with_name(f"{table_dir.name}.old")
+        os.replace(live_dir, stale)
+        os.replace(table_dir, live_dir)
+        shutil.rmtree(stale, ignore_errors=True)
+    return len(new)
+
+
+def list_partitions(table_name: str) -> list[str]:
+    return sorted(p.stem for p in _table_dir(table_name).glob("*.parquet"))
+
+
+def _select_partitions(table_name: str, start=None, end=None, partitions=None):
+    spec = TABLES[table_name]
+    fmt = spec["partition"]
+    if start is not None:
+        start = _to_datetime(pd.Series([start]), spec["utc"]).iloc[0]
+    if end is not None:
+        end = _to_datetime(pd.Series([end]), spec["utc"]).iloc[0]
+
+    keys = list_partitions(table_name)
+    if partitions is not None:
+        wanted = set(partitions)
+        keys = [k for k in keys if k in wanted]
+    if start is not None:
+        keys = [k for k in keys if k >= start.strftime(fmt)]
+    if end is not None:
+        keys = [k for k in keys if k <= end.strftime(fmt)]
+    return keys, start, end
+
+
+def _read_partition(table_name: str, key: str, start, end, columns, filters) -> pd.DataFrame:
+    col = TABLES[table_name]["watermark"]
+    df = pd.read_parquet(_table_dir(table_name) / f"{key}.parquet", columns=columns, filters=filters)
+    if df.empty:
+        return df
+    df = schema.coerce(table_name, df)
+    if start is not None:
+        df = df[df[col] >= start]
+    if end is not None:
+        df = df[df[col] <= end]
+    return df
+
+
+def load_table(table_name: str, start=None, end=None, columns=None, filters=None, partitions=None) -> pd.DataFrame:
+    """Lees (een deel van) een tabel uit de lokale store.
+
+    start/end begrenzen de watermark-kolom, filters wordt als pyarrow-filter doorgegeven
+    en partitions beperkt het lezen tot de opgegeven partitiesleutels.
+    """
+    with instrument.span("store", f"load {table_name}") as event:
+        col = TABLES[table_name]["watermark"]
+        keys, start, end = _select_partitions(table_name, start, end, partitions)
+        if columns is not None and col not in columns:
+            columns = [col, *columns]
+        frames = [pd.read_parquet(_table_dir(table_name) / f"{k}.parquet", columns=columns, filters=filters) for k in keys]
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return pd.DataFrame(columns=columns or [])
+        df = schema.coerce(table_name, pd.concat(frames, ignore_index=True))
+        if start is not None:
+            df = df[df[col] >= start]
+        if end is not None:
+            df = df[df[col] <= end]
+        event["rows"] = len(df)
+        event["partitions"] = len(keys)
+        return df.sort_values(col).reset_index(drop=True)
+
+
+def iter_table(table_name: str, start=None, end=None, columns=None, filters=None, partitions=None):
+    """Zelfde selectie als load_table, maar partitie voor partitie (voor exports zonder alles in geheugen)."""
+    col = TABLES[table_name]["watermark"]
+    keys, start, end = _select_partitions(table_name, start, end, partitions)
+    if columns is not None and col not in columns:
+        columns = [col, *columns]
+    for key in keys:
+        df = _read_partition(table_name, key, start, end, columns, filters)
+        if not df.empty:
+            yield df.sort_values(col, kind="stable").reset_index(drop=True)
+
+
+def partition_key(table_name: str, value) -> str:
+    spec = TABLES[table_name]
+    return _to_datetime(pd.Series([value]), spec["utc"]).iloc[0].strftime(spec["partition"])
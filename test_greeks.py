@@ -0,0 +1,90 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+import greeks
+
+
+def _random_chain(n, seed=0):
+    rng = np.random.default_rng(seed)
+    spot = np.full(n, 5000.0)
+    strike = rng.uniform(3000, 7000, n).round()
+    t = rng.uniform(1 / 365, 2, n)
+    is_put = rng.random(n) < 0.5
+    sigma = rng.uniform(0.08, 0.8, n)
+    return spot, strike, t, is_put, sigma
+
+
+def test_implied_volatility_recovers_sigma():
+    spot, strike, t, is_put, sigma = _random_chain(20000)
+    target = greeks.price(spot, strike, t, sigma, is_put)
+    iv = greeks.implied_volatility(target, spot, strike, t, is_put)
+    # Met vega > 0.01 (per volatiliteitspunt) ligt de prijs vast genoeg om sigma terug te vinden
+    informative = greeks.greeks(spot, strike, t, sigma, is_put)["vega"] > 0.01
+    assert informative.mean() > 0.5
+    assert not np.isnan(iv[informative]).any()
+    assert np.max(np.abs(iv - sigma)[informative]) < 2e-5
+
+
+def test_implied_volatility_outside_arbitrage_bounds_is_nan():
+    spot, strike, t = np.full(4, 5000.0), np.array([4000.0, 4000.0, 6000.0, 5000.0]), np.full(4, 0.5)
+    is_put = np.array([False, True, True, False])
+    target = np.array([
+        1.0,     # call onder de intrinsieke waarde
+        6000.0,  # put boven de contante strike
+        np.nan,
+        100.0,
+    ])
+    iv = greeks.implied_volatility(target, spot, strike, t, is_put)
+    assert np.isnan(iv[:3]).all()
+    assert 0 < iv[3] < 1
+
+
+def test_implied_volatility_without_time_left_is_nan():
+    iv = greeks.implied_volatility([50.0, 50.0], [5000.0] * 2, [5000.0] * 2, [0.0, -0.1], [False, True])
+    assert np.isnan(iv).all()
+
+
+def test_greeks_match_finite_differences():
+    spot, strike, t, is_put, sigma = _random_chain(200, seed=1)
+    g = greeks.greeks(spot, strike, t, sigma, is_put)
+
+    def p(s=spot, tt=t, vol=sigma):
+        return greeks.price(s, strike, tt, vol, is_put)
+
+    np.testing.assert_allclose(g["delta"], (p(s=spot + 1) - p(s=spot - 1)) / 2, atol=1e-4)
+    up, down = (greeks.greeks(s, strike, t, sigma, is_put)["delta"] for s in (spot + 1, spot - 1))
+    np.testing.assert_allclose(g["gamma"], (up - down) / 2, rtol=1e-3, atol=1e-7)
+    np.testing.assert_allclose(g["vega"], (p(vol=sigma + 1e-4) - p(vol=sigma - 1e-4)) / 2e-4 / 100, rtol=1e-3, atol=1e-5)
+    np.testing.assert_allclose(g["theta"], (p(tt=t - 1e-5) - p(tt=t + 1e-5)) / 2e-5 / 365, rtol=1e-3, atol=1e-4)
+
+
+def test_norm_cdf_accuracy():
+    x = np.linspace(-8, 8, 1001)
+    ref = np.array([0.5 * math.erfc(-v / math.sqrt(2)) for v in x])
+    assert np.max(np.abs(greeks.norm_cdf(x) - ref) / ref) < 2e-7
+
+
+def test_option_greeks_uses_mid_and_falls_back_to_quoted_iv():
+    snapshot = pd.Timestamp("2025-03-03 15:00", tz="UTC")
+    df = pd.DataFrame({
+        "snapshot_date": [snapshot] * 3,
+        "expiration": pd.to_datetime(["2025-06-20"] * 3),
+        "type": ["call", "put", "call"],
+        "strike": [5000, 4800, 5200],
+        "underlying_price": [5000.0] * 3,
+        "implied_volatility": [0.2, 0.25, 0.3],
+    })
+    t = greeks.years_to_expiry(df)
+    fair = greeks.price(5000.0, df["strike"].to_numpy(), t, 0.18, (df["type"] == "put").to_numpy())
+    df["bid"] = [fair[0] - 0.05, fair[1] - 0.05, 0.0]
+    df["ask"] = [fair[0] + 0.05, fair[1] + 0.05, 0.0]
+    df["last_price"] = [np.nan, np.nan, 0.0]
+
+    out = greeks.option_greeks(df)
+    np.testing.assert_allclose(out["iv_mid"].to_numpy()[:2], 0.18, atol=1e-6)
+    # Geen quote en geen laatste prijs: geen iv_mid, greeks uit de aangeleverde implied_volatility
+    assert np.isnan(out["iv_mid"].iloc[2])
+    expected = greeks.greeks(5000.0, 5200.0, t[2], 0.3, False)
+    np.testing.assert_allclose(out["delta"].iloc[2], expected["delta"])
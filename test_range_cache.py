@@ -0,0 +1,98 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import cache
+
+DATES = pd.bdate_range("2015-01-01", "2024-12-31")
+FULL = pd.DataFrame({"date": DATES, "x": np.arange(len(DATES), dtype=float)})
+
+
+@pytest.fixture
+def loader():
+    calls = []
+
+    def fn(start=None, end=None, kind="a"):
+        calls.append((start, end, kind))
+        d = FULL
+        if start is not None:
+            d = d[d["date"] >= start]
+        if end is not None:
+            d = d[d["date"] <= end]
+        return d.assign(k=kind).reset_index(drop=True)
+
+    fn.calls = calls
+    return fn
+
+
+def _segments(rc, **params):
+    key = tuple(sorted(params.items()))
+    return sorted((lo, hi) for pk, lo, hi in rc.segments if pk == key)
+
+
+def test_adjacent_ranges_merge_into_one_segment(loader):
+    rc = cache.RangeCache(loader, "date", ttl=3600)
+    rc("2020-01-01", "2020-03-31")
+    rc("2020-04-01", "2020-06-30")
+    assert _segments(rc) == [(pd.Timestamp("2020-01-01"), pd.Timestamp("2020-06-30"))]
+
+
+def test_contained_range_is_sliced_without_fetch(loader):
+    rc = cache.RangeCache(loader, "date", ttl=3600)
+    rc("2020-01-01", "2020-06-30")
+    loader.calls.clear()
+    got = rc("2020-02-01", "2020-05-31")
+    assert loader.calls == []
+    pd.testing.assert_frame_equal(got.reset_index(drop=True), loader("2020-02-01", "2020-05-31"))
+
+
+def test_extending_range_fetches_only_the_gaps(loader):
+    rc = cache.RangeCache(loader, "date", ttl=3600)
+    rc("2020-01-01", "2020-06-30")
+    loader.calls.clear()
+    rc("2019-12-01", "2020-08-31")
+    assert [(pd.Timestamp(s), pd.Timestamp(e)) for s, e, _ in loader.calls] == [
+        (pd.Timestamp("2019-12-01"), pd.Timestamp("2020-01-01")),
+        (pd.Timestamp("2020-06-30"), pd.Timestamp("2020-08-31")),
+    ]
+    assert _segments(rc) == [(pd.Timestamp("2019-12-01"), pd.Timestamp("2020-08-31"))]
+
+
+def test_lru_eviction_keeps_cache_within_budget(loader):
+    years = [(f"{y}-01-01", f"{y}-06-30") for y in range(2015, 2025)]
+    # Budget voor ruim drie halve jaren
+    probe = cache.RangeCache(loader, "date", ttl=3600)
+    probe(*years[0])
+    budget = int(3.5 * probe.nbytes)
+    rc = cache.RangeCache(loader, "date", ttl=3600, budget_mb=budget / 1024 / 1024)
+    for start, end in years:
+        rc(start, end)
+        assert rc.nbytes <= budget
+    # De oudste segmenten zijn verwijderd, de laatst gebruikte staan er nog
+    kept = _segments(rc)
+    assert len(kept) == 3
+    assert kept[-1] == (pd.Timestamp("2024-01-01"), pd.Timestamp("2024-06-30"))
+    assert (pd.Timestamp("2015-01-01"), pd.Timestamp("2015-06-30")) not in kept
+
+    # Een hit zet het segment achteraan in de LRU-volgorde
+    rc(*kept[0])
+    assert list(rc.segments)[-1][1:] == kept[0]
+
+
+def test_matches_direct_load_over_random_ranges(loader):
+    rc = cache.RangeCache(loader, "date", ttl=3600, budget_mb=0.2)
+    rng = random.Random(1)
+    for _ in range(300):
+        a = pd.Timestamp("2014-06-01") + pd.Timedelta(days=rng.randint(0, 4000))
+        b = a + pd.Timedelta(days=rng.randint(0, 400))
+        start = None if rng.random() < 0.03 else a
+        end = None if rng.random() < 0.03 else b
+        kind = rng.choice("ab")
+        got = rc(start, end, kind=kind)
+        pd.testing.assert_frame_equal(got.reset_index(drop=True), loader(start, end, kind))
+        for k in "ab":
+            segments = _segments(rc, kind=k)
+            assert all(x[1] < y[0] for x, y in zip(segments, segments[1:])), segments
+        assert rc.nbytes <= 0.2 * 1024 * 1024 or len(rc.segments) == 1
@@ -0,0 +1,132 @@
+import json
+
+import numpy as np
+import pytest
+
+from bench.fake_postgrest import Server
+from bench.generate import generate_all
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    # Fake PostgREST waarin de laatste optiesnapshot maar half binnen is
+    tables = generate_all(fx_days=300, sp500_days=300, option_rows=4000)
+    columns, kinds = tables["spx_options2"]
+    last = np.flatnonzero(columns["snapshot_date"] == columns["snapshot_date"].max())
+    keep = np.ones(len(columns["id"]), dtype=bool)
+    keep[last[len(last) // 2:]] = False
+    tables["spx_options2"] = ({c: v[keep] for c, v in columns.items()}, kinds)
+    server = Server(tables).start()
+    monkeypatch.setenv("SUPABASE_URL", server.url)
+    monkeypatch.setenv("SUPABASE_KEY", "test.fake.key")
+
+    import connection
+    import shared
+    import store
+    monkeypatch.setattr(connection, "_client", None)
+    monkeypatch.setattr(store, "STORE_DIR", tmp_path)
+    monkeypatch.setattr(shared, "SHARED_DIR", tmp_path / "_shared")
+    rest = {c: v[~keep] for c, v in columns.items()}
+    return store, server, rest
+
+
+def test_completed_snapshot_bumps_version(env):
+    store, server, rest = env
+    store.sync_table("spx_options2", force=True)
+    version, watermark = store.get_version("spx_options2"), store.get_watermark("spx_options2")
+    rows = len(store.load_table("spx_options2"))
+
+    # Opnieuw lezen zonder wijzigingen: zelfde versie
+    store.sync_table("spx_options2", force=True)
+    assert store.get_version("spx_options2") == version
+
+    server.tables["spx_options2"].append(rest)
+    store.sync_table("spx_options2", force=True)
+    assert store.get_watermark("spx_options2") == watermark
+    assert store.get_version("spx_options2") > version
+    assert len(store.load_table("spx_options2")) == rows + len(rest["id"])
+
+
+def test_schema_change_rebuilds_without_reusing_versions(env):
+    store, _, _ = env
+    assert store.get_version("fx_rates") is None
+    store.sync_table("fx_rates", force=True)
+    version = store.get_version("fx_rates")
+    rows = len(store.load_table("fx_rates"))
+
+    path = store._table_dir("fx_rates") / "_meta.json"
+    meta = json.loads(path.read_text())
+    path.write_text(json.dumps({**meta, "schema": -1}))
+    store.sync_table("fx_rates")
+    assert store.get_version("fx_rates") > version
+    assert len(store.load_table("fx_rates")) == rows
+    assert sorted(p.name for p in store.STORE_DIR.iterdir() if p.name != "_shared") == ["fx_rates", "fx_rates.lock"]
+
+
+def test_chain_picks_up_completed_snapshot(env):
+    import chain
+
+    store, server, rest = env
+    store.sync_table("spx_options2", force=True)
+    option_chain = chain.OptionChain()
+    option_chain.refresh()
+    rows = len(option_chain)
+
+    server.tables["spx_options2"].append(rest)
+    store.sync_table("spx_options2", force=True)
+    assert len(option_chain.refresh()) == rows + len(rest["id"])
+    # Een nieuw proces koppelt het gedeelde bestand van de nieuwe versie
+    assert len(chain.OptionChain().refresh()) == rows + len(rest["id"])
+
+
+def test_catalog_counts_completed_snapshot(env, monkeypatch):
+    import catalog
+
+    store, server, rest = env
+    monkeypatch.setattr(catalog, "_cache", {})
+    store.sync_table("spx_options2", force=True)
+    _, snapshots = catalog.refresh("spx_options2")
+    rows = snapshots["rows"].iloc[-1]
+
+    server.tables["spx_options2"].append(rest)
+    store.sync_table("spx_options2", force=True)
+    _, snapshots = catalog.refresh("spx_options2")
+    assert snapshots["rows"].iloc[-1] == rows + len(rest["id"])
+    # Ook zonder de cache in het geheugen: de catalogus op schijf hoort bij de nieuwe versie
+    catalog._cache.clear()
+    _, snapshots = catalog.refresh("spx_options2")
+    assert snapshots["rows"].iloc[-1] == rows + len(rest["id"])
+
+
+def test_rollups_follow_rewritten_days(env, monkeypatch):
+    import rollups
+
+    store, server, _ = env
+    monkeypatch.setattr(rollups, "_cache", {})
+    store.sync_table("sp500_delta_view", force=True)
+    before = rollups.refresh("sp500_delta_view")["week"]
+
+    # De laatste dag wordt in de bron gecorrigeerd: zelfde watermark, nieuwe versie
+    table = server.tables["sp500_delta_view"]
+    table.columns["close"][-1] += 100
+    table._text = {}
+    store.sync_table("sp500_delta_view", force=True)
+
+    after = rollups.refresh("sp500_delta_view")["week"]
+    assert after["close"].iloc[-1] == pytest.approx(before["close"].iloc[-1] + 100)
+    assert after["close"].iloc[:-1].tolist() == before["close"].iloc[:-1].tolist()
+
+
+def test_empty_selection_keeps_typed_schema(env):
+    import schema
+    import utils
+
+    kwargs = dict(columns=schema.select_clause("spx_options2"), keyset=("snapshot_date", "id"), workers=4, typed=True)
+    full = utils.get_supabase_data_in_chunks("spx_options2", **kwargs)
+    empty = utils.get_supabase_data_in_chunks("spx_options2", filters=[("gt", "snapshot_date", "2100-01-01T00:00:00+00:00")], **kwargs)
+    assert empty.empty
+    # Zelfde soort dtype per kolom (de tijdseenheid en categorieën hangen van de waarden af)
+    def kinds(df):
+        return {c: (type(d).__name__, d.kind, str(getattr(d, "tz", None))) for c, d in df.dtypes.items()}
+
+    assert kinds(empty) == kinds(full)
@@ -1,26 +1,126 @@
 import os
-from supabase import create_client
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
-from dotenv import load_dotenv
+import schema
+from connection import execute, table
 
-load_dotenv()
+# Standaard aantal gelijktijdige range-requests bij keyset-fetches
+FETCH_WORKERS = int(os.getenv("FX_FETCH_WORKERS", "4"))
 
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_KEY")
-supabase = create_client(supabase_url, supabase_key)
+def apply_filters(query, filters=None):
+    # filters: lijst van (operator, kolom, waarde), bv. ("gte", "date", "2024-01-01")
+    for op, column, value in filters or []:
+        query = getattr(query, op)(column, value)
+    return query
 
-def get_supabase_data_in_chunks(table_name: str, chunk_size: int = 1000) -> pd.DataFrame:
-    all_data = []
-    offset = 0
+def _quote(value) -> str:
+    # PostgREST: waarden met gereserveerde tekens (:, +, komma) tussen dubbele quotes
+    return '"{}"'.format(str(value).replace('"', '\\"'))
+
+def _seek_condition(keys, values) -> str:
+    # (k1, k2, ...) > (v1, v2, ...) uitgeschreven als PostgREST or-filter
+    parts = []
+    for i, key in enumerate(keys):
+        eqs = [f"{k}.eq.{_quote(v)}" for k, v in zip(keys[:i], values[:i])]
+        gt = f"{key}.gt.{_quote(values[i])}"
+        parts.append(f"and({','.join(eqs + [gt])})" if eqs else gt)
+    return ",".join(parts)
+
+def _fetch_keyset(table_name, keys, columns, filters, chunk_size) -> list:
+    rows = []
+    last = None
+    page = 0
     while True:
-        response = (
-            supabase.table(table_name)
-            .select("*")
-            .range(start=offset, end=offset + chunk_size - 1)
-            .execute()
-        )
+        query = apply_filters(table(table_name).select(columns), filters)
+        if last is not None:
+            if len(keys) == 1:
+                query = query.gt(keys[0], last[0])
+            else:
+                query = query.or_(_seek_condition(keys, last))
+        for key in keys:
+            query = query.order(key)
+        response = execute(query.limit(chunk_size), page=page)
         if not response.data:
             break
-        all_data.extend(response.data)
-        offset += chunk_size
-    return pd.DataFrame(all_data)
+        rows.extend(response.data)
+        last = [response.data[-1][k] for k in keys]
+        page += 1
+    return rows
+
+def key_bounds(table_name: str, column: str, filters: list | None = None):
+    lo = execute(apply_filters(table(table_name).select(column), filters).order(column).limit(1))
+    hi = execute(apply_filters(table(table_name).select(column), filters).order(column, desc=True).limit(1))
+    if not lo.data or not hi.data:
+        return None, None
+    return lo.data[0][column], hi.data[0][column]
+
+def split_key_range(lo, hi, parts: int) -> list:
+    # Grenzen voor numerieke of datum-achtige sleutels; resultaat bevat parts + 1 punten
+    if isinstance(lo, (int, float)) and isinstance(hi, (int, float)):
+        step = (hi - lo) / parts
+        bounds = [lo + step * i for i in range(parts)] + [hi]
+    else:
+        bounds = [ts.isoformat() for ts in pd.date_range(pd.Timestamp(lo), pd.Timestamp(hi), periods=parts + 1)]
+        bounds[0], bounds[-1] = lo, hi
+    return bounds
+
+def _frame(table_name: str, rows: list, typed: bool, columns: str = "*") -> pd.DataFrame:
+    if not typed:
+        return pd.DataFrame(rows)
+    return schema.decode(table_name, rows, None if columns == "*" else [c.strip() for c in columns.split(",")])
+
+def get_supabase_data_in_chunks(
+    table_name: str,
+    chunk_size: int = 1000,
+    columns: str = "*",
+    filters: list | None = None,
+    order_by: str | None = None,
+    keyset: str | tuple | None = None,
+    workers: int = 1,
+    typed: bool = False,
+) -> pd.DataFrame:
+    """Haal een tabel op in pagina's van chunk_size rijen.
+
+    Zonder keyset wordt met offsets gepagineerd. Met keyset (een unieke kolom of een tuple
+    kolommen, bv. ("snapshot_date", "id")) wordt op de sleutel gezocht in plaats van op offset;
+    met workers > 1 wordt de sleutelruimte in ranges gesplitst die gelijktijdig worden opgehaald
+    en daarna in volgorde worden samengevoegd. Met typed=True worden de rijen via het schema
+    direct naar compacte dtypes gedecodeerd.
+    """
+    if keyset is None:
+        all_data = []
+        offset = 0
+        while True:
+            query = apply_filters(table(table_name).select(columns), filters)
+            if order_by:
+                query = query.order(order_by)
+            response = execute(query.range(start=offset, end=offset + chunk_size - 1), page=offset // chunk_size)
+            if not response.data:
+                break
+            all_data.extend(response.data)
+            offset += chunk_size
+        return _frame(table_name, all_data, typed, columns)
+
+    keys = [keyset] if isinstance(keyset, str) else list(keyset)
+    if columns != "*":
+        selected = [c.strip() for c in columns.split(",")]
+        columns = ", ".join(selected + [k for k in keys if k not in selected])
+
+    if workers <= 1:
+        return _frame(table_name, _fetch_keyset(table_name, keys, columns, filters, chunk_size), typed, columns)
+
+    lo, hi = key_bounds(table_name, keys[0], filters)
+    if lo is None:
+        return _frame(table_name, [], typed, columns)
+    if lo == hi:
+        return _frame(table_name, _fetch_keyset(table_name, keys, columns, filters, chunk_size), typed, columns)
+    bounds = split_key_range(lo, hi, workers * 2)
+    ranges = []
+    for i in range(len(bounds) - 1):
+        upper = ("lte", keys[0], bounds[i + 1]) if i == len(bounds) - 2 else ("lt", keys[0], bounds[i + 1])
+        ranges.append(list(filters or []) + [("gte", keys[0], bounds[i]), upper])
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        chunks = pool.map(lambda f: _fetch_keyset(table_name, keys, columns, f, chunk_size), ranges)
+        all_data = [row for chunk in chunks for row in chunk]
+    return _frame(table_name, all_data, typed, columns)
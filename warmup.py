@@ -0,0 +1,90 @@
+import os
+import threading
+import time
+import traceback
+
+import catalog
+import chain
+import correlation
+import loaders
+import rollups
+import store
+
+# Achtergrond-scheduler: warmt bij processtart de veelgebruikte queries op en opnieuw zodra een
+# sync de data wijzigt (nieuwe of aangevulde rijen, zie store.get_version), zodat de eerste
+# gebruiker niet op een volledige reload wacht.
+POLL_INTERVAL = int(os.getenv("FX_WARMUP_POLL", "60"))
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def warm_fx() -> None:
+    # FX-pagina: volledige historie (indicatoren) en het standaardvenster van 3 maanden;
+    # overige vensters verlopen en worden bij het volgende bezoek op de achtergrond ververst
+    loaders.load_fx.mark_stale()
+    loaders.load_fx.refresh().result()
+    start, end = loaders.fx_default_window()
+    if start is not None:
+        loaders.load_fx.refresh(start, end).result()
+    rollups.refresh("fx_rates")
+    correlation.get_engine()
+
+
+def warm_sp500() -> None:
+    loaders.load_sp500.mark_stale()
+    loaders.load_sp500.refresh().result()
+    rollups.refresh("sp500_delta_view")
+    correlation.get_engine()
+
+
+def warm_options() -> None:
+    # Pagina 3 (laatste snapshot) en 4 (standaardserie) zijn slices uit de keten en de catalogus
+    catalog.refresh("spx_options2")
+    chain.get_chain("spx_options2")
+
+
+JOBS = {
+    "fx_rates": warm_fx,
+    "sp500_delta_view": warm_sp500,
+    "spx_options2": warm_options,
+}
+
+
+_warmed = {}
+
+
+def _run(table_name: str) -> None:
+    try:
+        # Versie vóór het opwarmen: een sync tijdens de job leidt bij de volgende poll tot een nieuwe ronde
+        version = store.get_version(table_name)
+        JOBS[table_name]()
+        _warmed[table_name] = version
+    except Exception:
+        traceback.print_exc()
+
+
+def _loop() -> None:
+    for table_name in JOBS:
+        _run(table_name)
+    while True:
+        time.sleep(POLL_INTERVAL)
+        for table_name in JOBS:
+            try:
+                store.sync_table(table_name)
+            except Exception:
+                traceback.print_exc()
+                continue
+            # Ook nieuwe data die een sync vanuit een pagina heeft binnengehaald telt mee
+            if store.get_version(table_name) != _warmed.get(table_name):
+                _run(table_name)
+
+
+def start() -> None:
+    """Start de scheduler één keer per proces (veilig om vanuit elke pagina aan te roepen)."""
+    global _started
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+    threading.Thread(target=_loop, name="warmup", daemon=True).start()